@@ -0,0 +1,159 @@
+"""
+Activity Module - Fil d'activité récente (nœuds et arêtes créés)
+Le fil est la fusion de plusieurs flux triés par (created_at, clé) décroissants : les nœuds
+du tenant, puis un flux par type de relation. Chaque flux est lu dans l'ordre d'un index
+range sur created_at à partir du curseur (pagination par clé, sans SKIP) : une page coûte
+O(limit) entrées d'index par flux, quelle que soit la taille du graph.
+
+Clés d'événement (départage à created_at égal, et curseur) :
+    nœud  : "n:<id>"
+    arête : "e:<source>><type>><target>"
+"""
+
+from typing import List, Optional, Tuple
+import heapq
+
+from .neo4j_client import run_query
+from .tenancy import node_type, safe_type, tenant_database, tenant_label
+
+# Début du fil (pas de curseur) : au-delà de tout timestamp et de toute clé
+_MAX_TS = 2 ** 63 - 1
+_MAX_KEY = "\uffff"
+
+
+def encode_cursor(created_at: int, key: str) -> str:
+    return f"{created_at}:{key}"
+
+
+def decode_cursor(cursor: Optional[str]) -> Tuple[int, str]:
+    """Retourne (created_at, clé) du dernier événement de la page précédente."""
+    if not cursor:
+        return _MAX_TS, _MAX_KEY
+    created_at, sep, key = cursor.partition(":")
+    if not sep or not created_at.isdigit() or not key:
+        raise ValueError("Curseur invalide")
+    return int(created_at), key
+
+
+def relationship_types(database: Optional[str]) -> List[str]:
+    """Types de relation connus de la base (lecture du catalogue, sans scan)."""
+    rows = run_query(
+        "CALL db.relationshipTypes() YIELD relationshipType RETURN relationshipType AS type",
+        write=False, database=database
+    )
+    # Seuls les noms injectables dans un motif Cypher sont retenus
+    return [row["type"] for row in rows if _is_type_name(row["type"])]
+
+
+def _is_type_name(name: str) -> bool:
+    try:
+        safe_type(name)
+        return True
+    except ValueError:
+        return False
+
+
+# ===== Flux =====
+
+def _node_stream(tenant: str, node_label: Optional[str], agent: Optional[str], ts: int, key: str, limit: int):
+    """
+    Nœuds du tenant après le curseur. Index utilisé :
+    type donné -> (tenant, created_at) du label de type ; agent donné -> (agent, created_at)
+    du label de tenant ; sinon (created_at) du label de tenant.
+    """
+    if node_label:
+        match = f"MATCH (n:{node_label}) WHERE n.tenant = $tenant AND n.created_at <= $ts"
+    else:
+        match = f"MATCH (n:{tenant_label(tenant)}) WHERE n.created_at <= $ts"
+    query = """
+    {match}
+      AND (n.created_at < $ts OR 'n:' + n.id < $key)
+      {agent_filter}
+    RETURN 'n:' + n.id AS key, {{
+        kind: 'node',
+        id: n.id,
+        type: {type},
+        content: n.content,
+        agent: n.agent,
+        created_at: n.created_at
+    }} AS event
+    ORDER BY n.created_at DESC, n.id DESC
+    LIMIT $limit
+    """.format(match=match, agent_filter="AND n.agent = $agent" if agent else "", type=node_type())
+    return run_query(
+        query,
+        {"tenant": tenant, "ts": ts, "key": key, "agent": agent, "limit": limit},
+        write=False, database=tenant_database(tenant)
+    )
+
+
+def _edge_stream(tenant: str, rel_type: str, agent: Optional[str], ts: int, key: str, limit: int):
+    """Arêtes d'un type après le curseur, via l'index (tenant, created_at) du type."""
+    query = """
+    MATCH (a)-[r:{rel_type}]->(b)
+    WHERE r.tenant = $tenant AND r.created_at <= $ts
+    WITH a, r, b, 'e:' + a.id + '>' + type(r) + '>' + b.id AS key
+    WHERE (r.created_at < $ts OR key < $key)
+      {agent_filter}
+    RETURN key, {{
+        kind: 'edge',
+        source: a.id,
+        target: b.id,
+        type: type(r),
+        agent: r.agent,
+        created_at: r.created_at
+    }} AS event
+    ORDER BY r.created_at DESC, key DESC
+    LIMIT $limit
+    """.format(rel_type=rel_type, agent_filter="AND r.agent = $agent" if agent else "")
+    return run_query(
+        query,
+        {"tenant": tenant, "ts": ts, "key": key, "agent": agent, "limit": limit},
+        write=False, database=tenant_database(tenant)
+    )
+
+
+def fetch_activity(
+    tenant: str,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    agent: Optional[str] = None,
+    type: Optional[str] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Retourne une page du fil d'activité, du plus récent au plus ancien.
+    `type` est un label de nœud (Task, Person...) ou un type de relation (depends_on...).
+
+    Returns:
+        Tuple (événements, curseur de la page suivante ou None)
+    """
+    ts, key = decode_cursor(cursor)
+    if type is not None:
+        type = safe_type(type)
+    rel_types = relationship_types(tenant_database(tenant))
+
+    streams = []
+    if type is None or type not in rel_types:
+        streams.append(_node_stream(tenant, type, agent, ts, key, limit + 1))
+    for rel_type in rel_types:
+        if type is None or rel_type == type:
+            streams.append(_edge_stream(tenant, rel_type, agent, ts, key, limit + 1))
+
+    # Chaque flux est déjà trié : fusion k-voies sur (created_at, clé) décroissants
+    merged = heapq.merge(
+        *streams,
+        key=lambda row: (row["event"]["created_at"], row["key"]),
+        reverse=True
+    )
+    page = []
+    for row in merged:
+        page.append(row)
+        if len(page) > limit:
+            break
+
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        last = page[-1]
+        next_cursor = encode_cursor(last["event"]["created_at"], last["key"])
+    return [row["event"] for row in page], next_cursor
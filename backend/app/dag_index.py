@@ -0,0 +1,437 @@
+"""
+DAG Index Module - Index des dépendances (depends_on) en mémoire
+Les arêtes (a)-[:depends_on]->(b) forment le plan de projet : b doit être fait avant a.
+L'index maintient, pour chaque tenant :
+    - un ordre topologique incrémental (Pearce-Kelly) : une insertion ne réordonne que la zone
+      affectée entre les deux extrémités ;
+    - les arcs qui fermeraient un cycle, mis à part ; les composantes fortement connexes
+      (Tarjan) ne sont calculées que s'il en existe, et mises en cache jusqu'au changement suivant.
+Impact (nœuds bloqués), cycles et chemin critique en O(V + E) au plus, sans requête Neo4j.
+"""
+
+from typing import Dict, List, Optional, Set, Tuple
+import os
+import threading
+import time
+
+from .neo4j_client import run_query
+from .tenancy import DEFAULT_TENANT, TenantRegistry, tenant_database, tenant_label
+
+# Active le chargement de l'index au démarrage (sinon chargé à la première requête /api/dag)
+DAG_INDEX_ENABLED = os.getenv("DAG_INDEX_ENABLED", "true").lower() == "true"
+# Rechargement complet périodique (secondes) pour intégrer les écritures des autres processus
+DAG_INDEX_REFRESH = float(os.getenv("DAG_INDEX_REFRESH", "300"))
+
+DEPENDS_ON = "depends_on"
+IMPACT_DIRECTIONS = ("downstream", "upstream")
+
+# Arc (prérequis, dépendant) : sens inverse de l'arête depends_on
+Arc = Tuple[str, str]
+
+
+def tarjan(nodes: List[str], succ: Dict[str, Set[str]]) -> List[List[str]]:
+    """
+    Composantes fortement connexes (Tarjan itératif, sans récursion).
+    Les composantes sont émises en ordre topologique inverse (puits d'abord).
+    """
+    index: Dict[str, int] = {}
+    low: Dict[str, int] = {}
+    on_stack: Set[str] = set()
+    stack: List[str] = []
+    components: List[List[str]] = []
+    counter = 0
+    for root in nodes:
+        if root in index:
+            continue
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        work = [(root, iter(succ.get(root, ())))]
+        while work:
+            node, children = work[-1]
+            advanced = False
+            for child in children:
+                if child not in index:
+                    index[child] = low[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(succ.get(child, ()))))
+                    advanced = True
+                    break
+                if child in on_stack:
+                    low[node] = min(low[node], index[child])
+            if advanced:
+                continue
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                low[parent] = min(low[parent], low[node])
+            if low[node] == index[node]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == node:
+                        break
+                components.append(component)
+    return components
+
+
+class DependencyDag:
+    """
+    Graphe des arcs prérequis -> dépendant d'un tenant, avec ordre topologique incrémental.
+    Invariant : ord[u] < ord[v] pour tout arc (u, v) hors de `_cycle_arcs`.
+    """
+
+    def __init__(self, tenant: str = DEFAULT_TENANT):
+        self.tenant = tenant
+        self._succ: Dict[str, Set[str]] = {}
+        self._pred: Dict[str, Set[str]] = {}
+        self._ord: Dict[str, int] = {}
+        self._next_ord = 0
+        self._cycle_arcs: Set[Arc] = set()
+        self._version = 0
+        self._scc_cache: Optional[Tuple[int, List[List[str]]]] = None
+        self._lock = threading.RLock()
+        self._warm = False
+        self._loading = False
+        self._pending: List[tuple] = []
+        self.loaded_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def warm(self) -> bool:
+        return self._warm
+
+    # ===== Cycle de vie =====
+
+    def start(self):
+        """Démarre le chargement initial et le rafraîchissement périodique en arrière-plan."""
+        if not DAG_INDEX_ENABLED or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"dag-index-{self.tenant}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread de rafraîchissement."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.load()
+            except Exception as e:
+                print(f"[DAG Index Error] {str(e)}")
+            self._stop.wait(DAG_INDEX_REFRESH if self._warm else 5)
+
+    def ensure_loaded(self):
+        """Charge l'index de façon synchrone s'il est encore froid (première requête)."""
+        if not self._warm:
+            self.load()
+
+    def load(self):
+        """
+        Recharge les arcs depuis Neo4j et recalcule l'ordre en O(V + E) :
+        ordre topologique des composantes (Tarjan), arcs internes aux cycles mis à part.
+        """
+        with self._lock:
+            self._loading = True
+            self._pending = []
+        try:
+            edges = run_query(
+                "MATCH (a:{label})-[:{rel}]->(b) RETURN a.id AS source, b.id AS target".format(
+                    label=tenant_label(self.tenant), rel=DEPENDS_ON
+                ),
+                write=False, database=tenant_database(self.tenant)
+            )
+        except Exception:
+            with self._lock:
+                self._loading = False
+                self._pending = []
+            raise
+
+        succ: Dict[str, Set[str]] = {}
+        pred: Dict[str, Set[str]] = {}
+        for edge in edges:
+            # a depends_on b : b (prérequis) -> a (dépendant)
+            prerequisite, dependent = edge["target"], edge["source"]
+            succ.setdefault(prerequisite, set()).add(dependent)
+            pred.setdefault(dependent, set()).add(prerequisite)
+            succ.setdefault(dependent, set())
+            pred.setdefault(prerequisite, set())
+        nodes = sorted(succ)
+        components = tarjan(nodes, succ)
+        order = {}
+        for component in reversed(components):
+            for node in component:
+                order[node] = len(order)
+        cycle_arcs = {(u, v) for u in succ for v in succ[u] if order[u] >= order[v]}
+
+        with self._lock:
+            self._succ, self._pred, self._ord = succ, pred, order
+            self._next_ord = len(order)
+            self._cycle_arcs = cycle_arcs
+            self._version += 1
+            self._scc_cache = (self._version, components)
+            pending, self._pending, self._loading = self._pending, [], False
+            for op in pending:
+                self._apply(*op)
+            self._warm = True
+            self.loaded_at = time.time()
+
+    # ===== Synchronisation avec les écritures =====
+
+    def _record(self, *op):
+        with self._lock:
+            self._apply(*op)
+            if self._loading:
+                self._pending.append(op)
+
+    def _apply(self, op: str, *args):
+        if op == "arc":
+            self._insert_arc(*args)
+        elif op == "remove":
+            self._remove_node(*args)
+        elif op == "clear":
+            self._succ, self._pred, self._ord, self._cycle_arcs = {}, {}, {}, set()
+            self._next_ord = 0
+            self._version += 1
+
+    def add_edge(self, source: str, rel_type: str, target: str):
+        """Arête source -[rel_type]-> target ; seules les depends_on sont indexées."""
+        if rel_type == DEPENDS_ON:
+            self._record("arc", target, source)
+
+    def add_edges(self, edges):
+        """Ajoute des arêtes au format {source, target, type}."""
+        for edge in edges:
+            self.add_edge(edge["source"], edge["type"], edge["target"])
+
+    def remove_node(self, node_id: str):
+        self._record("remove", node_id)
+
+    def clear(self):
+        self._record("clear")
+
+    # ===== Ordre topologique incrémental (Pearce-Kelly) =====
+
+    def _add_vertex(self, node: str):
+        if node not in self._ord:
+            self._ord[node] = self._next_ord
+            self._next_ord += 1
+            self._succ.setdefault(node, set())
+            self._pred.setdefault(node, set())
+
+    def _insert_arc(self, u: str, v: str):
+        if v in self._succ.get(u, ()):
+            return
+        self._add_vertex(u)
+        self._add_vertex(v)
+        self._succ[u].add(v)
+        self._pred[v].add(u)
+        self._version += 1
+        if not self._order_arc(u, v):
+            self._cycle_arcs.add((u, v))
+
+    def _order_arc(self, u: str, v: str) -> bool:
+        """
+        Rétablit ord[u] < ord[v] en ne déplaçant que les nœuds de la zone [ord[v], ord[u]].
+
+        Returns:
+            False si l'arc fermerait un cycle (ordre inchangé)
+        """
+        lower, upper = self._ord[v], self._ord[u]
+        if u == v:
+            return False
+        if lower > upper:
+            return True
+        # Avant : descendants de v dans la zone ; si u en fait partie, l'arc ferme un cycle
+        forward = self._search(v, self._succ, lambda n: self._ord[n] <= upper, stop_at=u)
+        if forward is None:
+            return False
+        # Arrière : ancêtres de u dans la zone
+        backward = self._search(u, self._pred, lambda n: self._ord[n] >= lower)
+        backward.sort(key=self._ord.__getitem__)
+        forward.sort(key=self._ord.__getitem__)
+        moved = backward + forward
+        slots = sorted(self._ord[n] for n in moved)
+        for node, slot in zip(moved, slots):
+            self._ord[node] = slot
+        return True
+
+    def _search(self, start: str, edges: Dict[str, Set[str]], in_zone, stop_at: Optional[str] = None):
+        """Parcours en profondeur sur les arcs ordonnés, borné à la zone affectée."""
+        seen = {start}
+        stack = [start]
+        while stack:
+            node = stack.pop()
+            for neighbor in edges.get(node, ()):
+                arc = (node, neighbor) if edges is self._succ else (neighbor, node)
+                if neighbor in seen or arc in self._cycle_arcs or not in_zone(neighbor):
+                    continue
+                if neighbor == stop_at:
+                    return None
+                seen.add(neighbor)
+                stack.append(neighbor)
+        return list(seen)
+
+    def _remove_node(self, node: str):
+        if node not in self._ord:
+            return
+        neighbors = (self._succ.pop(node) | self._pred.pop(node)) - {node}
+        for neighbor in neighbors:
+            self._pred[neighbor].discard(node)
+            self._succ[neighbor].discard(node)
+        del self._ord[node]
+        # Comme au chargement, un nœud sans arête ne fait plus partie de l'index
+        for neighbor in neighbors:
+            if not self._succ[neighbor] and not self._pred[neighbor]:
+                del self._succ[neighbor], self._pred[neighbor], self._ord[neighbor]
+        self._version += 1
+        if self._cycle_arcs:
+            # Les arcs mis à part peuvent redevenir ordonnables une fois un cycle brisé
+            self._cycle_arcs = {arc for arc in self._cycle_arcs if node not in arc}
+            for arc in list(self._cycle_arcs):
+                self._cycle_arcs.discard(arc)
+                if not self._order_arc(*arc):
+                    self._cycle_arcs.add(arc)
+
+    # ===== Requêtes =====
+
+    def _components(self) -> List[List[str]]:
+        """Composantes fortement connexes (cache invalidé à chaque modification)."""
+        if self._scc_cache is None or self._scc_cache[0] != self._version:
+            nodes = sorted(self._ord, key=self._ord.__getitem__)
+            self._scc_cache = (self._version, tarjan(nodes, self._succ))
+        return self._scc_cache[1]
+
+    def topological_order(self) -> List[str]:
+        """Prérequis d'abord (les arcs de cycle sont ignorés)."""
+        with self._lock:
+            return sorted(self._ord, key=self._ord.__getitem__)
+
+    def cycles(self) -> List[dict]:
+        """Cycles : une entrée par composante fortement connexe non triviale, avec un cycle exemple."""
+        with self._lock:
+            if not self._cycle_arcs:
+                return []
+            cycles = []
+            for component in self._components():
+                if len(component) == 1 and component[0] not in self._succ.get(component[0], ()):
+                    continue
+                members = set(component)
+                cycles.append({
+                    "nodes": sorted(members),
+                    "example": self._example_cycle(min(members), members),
+                })
+            cycles.sort(key=lambda c: (-len(c["nodes"]), c["nodes"][0]))
+            return cycles
+
+    def _example_cycle(self, start: str, members: Set[str]) -> List[str]:
+        # BFS dans la composante jusqu'au retour sur `start`
+        parents: Dict[str, str] = {}
+        frontier = [start]
+        while frontier:
+            layer = []
+            for node in frontier:
+                for neighbor in self._succ.get(node, ()):
+                    if neighbor == start:
+                        path = [node]
+                        while path[-1] != start:
+                            path.append(parents[path[-1]])
+                        # Sens depends_on : chaque nœud dépend du suivant
+                        return path + [node]
+                    if neighbor in members and neighbor not in parents:
+                        parents[neighbor] = node
+                        layer.append(neighbor)
+            frontier = layer
+        return [start]
+
+    def impact(self, node_id: str, direction: str = "downstream", limit: int = 1000) -> Optional[dict]:
+        """
+        Nœuds bloqués par `node_id` (downstream : dépendants transitifs) ou dont il dépend
+        (upstream : prérequis transitifs), avec leur distance. None si le nœud n'a aucune dépendance.
+        """
+        with self._lock:
+            if node_id not in self._ord:
+                return None
+            edges = self._succ if direction == "downstream" else self._pred
+            depth = {node_id: 0}
+            frontier = [node_id]
+            while frontier:
+                layer = []
+                for node in frontier:
+                    for neighbor in edges.get(node, ()):
+                        if neighbor not in depth:
+                            depth[neighbor] = depth[node] + 1
+                            layer.append(neighbor)
+                frontier = layer
+            del depth[node_id]
+            nodes = sorted(depth.items(), key=lambda item: (item[1], item[0]))
+            return {
+                "count": len(nodes),
+                "nodes": [{"id": n, "depth": d} for n, d in nodes[:limit]],
+            }
+
+    def critical_path(self, target: Optional[str] = None) -> Optional[dict]:
+        """
+        Plus longue chaîne de dépendances (en nœuds), globale ou se terminant à `target`.
+        Graphe acyclique : programmation dynamique dans l'ordre topologique maintenu.
+        Sinon : sur le graphe condensé (une composante = un bloc de poids = sa taille).
+        """
+        with self._lock:
+            if target is not None and target not in self._ord:
+                return None
+            if self._cycle_arcs:
+                blocks = list(reversed(self._components()))
+            else:
+                blocks = [[n] for n in sorted(self._ord, key=self._ord.__getitem__)]
+            block_of = {node: i for i, block in enumerate(blocks) for node in block}
+
+            length = [0] * len(blocks)
+            parent: List[Optional[int]] = [None] * len(blocks)
+            for i, block in enumerate(blocks):
+                best, best_parent = 0, None
+                for node in block:
+                    for prerequisite in self._pred.get(node, ()):
+                        j = block_of[prerequisite]
+                        if j != i and length[j] > best:
+                            best, best_parent = length[j], j
+                length[i] = best + len(block)
+                parent[i] = best_parent
+
+            if not blocks:
+                return {"length": 0, "path": [], "acyclic": True}
+            end = block_of[target] if target is not None else max(range(len(blocks)), key=length.__getitem__)
+            chain = []
+            while end is not None:
+                chain.append(sorted(blocks[end]))
+                end = parent[end]
+            chain.reverse()
+            return {
+                "length": length[block_of[chain[-1][0]]],
+                # Prérequis d'abord ; un cycle apparaît comme un seul bloc de plusieurs nœuds
+                "path": chain,
+                "acyclic": not self._cycle_arcs,
+            }
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "nodes": len(self._ord),
+                "arcs": sum(len(v) for v in self._succ.values()),
+                "cycle_arcs": len(self._cycle_arcs),
+                "loaded_at": self.loaded_at,
+            }
+
+
+# Un index par tenant, alimenté par les routes d'écriture
+dags = TenantRegistry(DependencyDag)
@@ -0,0 +1,255 @@
+"""
+Graph Index Module - Index d'adjacence en mémoire
+Charge toutes les arêtes d'un tenant une fois (puis périodiquement), reste synchronisé avec
+les écritures du processus, et répond aux plus courts chemins par BFS bidirectionnel sans
+requête Neo4j. Un index par tenant (TenantRegistry).
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import os
+import threading
+import time
+
+from .neo4j_client import run_query
+from .tenancy import DEFAULT_TENANT, TenantRegistry, node_type, tenant_database, tenant_label
+
+# Active le chargement de l'index au démarrage
+PATH_INDEX_ENABLED = os.getenv("PATH_INDEX_ENABLED", "true").lower() == "true"
+# Rechargement complet périodique (secondes) pour intégrer les écritures des autres processus
+PATH_INDEX_REFRESH = float(os.getenv("PATH_INDEX_REFRESH", "300"))
+
+DIRECTIONS = ("out", "in", "both")
+
+# (type de relation, voisin)
+Adjacency = Dict[str, Set[Tuple[str, str]]]
+
+
+class AdjacencyIndex:
+    """
+    Listes d'adjacence sortantes et entrantes d'un tenant, indexées par ID de nœud.
+    L'index est « froid » tant que le premier chargement n'est pas terminé ;
+    les écritures reçues pendant un chargement sont rejouées à la fin.
+    """
+
+    def __init__(self, tenant: str = DEFAULT_TENANT):
+        self.tenant = tenant
+        self._out: Adjacency = {}
+        self._in: Adjacency = {}
+        self._types: Dict[str, str] = {}
+        self._lock = threading.RLock()
+        self._warm = False
+        self._loading = False
+        self._pending: List[tuple] = []
+        self.loaded_at: Optional[float] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def warm(self) -> bool:
+        return self._warm
+
+    # ===== Cycle de vie =====
+
+    def start(self):
+        """Démarre le chargement initial et le rafraîchissement périodique en arrière-plan."""
+        if not PATH_INDEX_ENABLED or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name=f"adjacency-index-{self.tenant}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread de rafraîchissement."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                self.load()
+            except Exception as e:
+                print(f"[Adjacency Index Error] {str(e)}")
+            self._stop.wait(PATH_INDEX_REFRESH if self._warm else 5)
+
+    def load(self):
+        """Recharge entièrement l'index depuis Neo4j, puis bascule sur les nouvelles listes."""
+        with self._lock:
+            self._loading = True
+            self._pending = []
+        try:
+            label, database = tenant_label(self.tenant), tenant_database(self.tenant)
+            nodes = run_query(
+                "MATCH (n:{label}) RETURN n.id AS id, {type} AS type".format(label=label, type=node_type()),
+                write=False, database=database
+            )
+            edges = run_query(
+                "MATCH (a:{label})-[r]->(b) RETURN a.id AS source, type(r) AS type, b.id AS target".format(label=label),
+                write=False, database=database
+            )
+        except Exception:
+            with self._lock:
+                self._loading = False
+                self._pending = []
+            raise
+
+        out: Adjacency = {}
+        inc: Adjacency = {}
+        for edge in edges:
+            out.setdefault(edge["source"], set()).add((edge["type"], edge["target"]))
+            inc.setdefault(edge["target"], set()).add((edge["type"], edge["source"]))
+        types = {node["id"]: node["type"] for node in nodes if node["id"] is not None}
+
+        with self._lock:
+            self._out, self._in, self._types = out, inc, types
+            pending, self._pending, self._loading = self._pending, [], False
+            for op in pending:
+                self._apply(*op)
+            self._warm = True
+            self.loaded_at = time.time()
+
+    # ===== Synchronisation avec les écritures =====
+
+    def _record(self, *op):
+        with self._lock:
+            self._apply(*op)
+            if self._loading:
+                self._pending.append(op)
+
+    def _apply(self, op: str, *args):
+        if op == "node":
+            node_id, node_type = args
+            self._types[node_id] = node_type
+        elif op == "edge":
+            source, rel_type, target = args
+            self._out.setdefault(source, set()).add((rel_type, target))
+            self._in.setdefault(target, set()).add((rel_type, source))
+        elif op == "remove":
+            (node_id,) = args
+            self._types.pop(node_id, None)
+            for rel_type, target in self._out.pop(node_id, ()):
+                self._in.get(target, set()).discard((rel_type, node_id))
+            for rel_type, source in self._in.pop(node_id, ()):
+                self._out.get(source, set()).discard((rel_type, node_id))
+        elif op == "clear":
+            self._out, self._in, self._types = {}, {}, {}
+
+    def add_node(self, node_id: str, node_type: str):
+        self._record("node", node_id, node_type)
+
+    def add_edge(self, source: str, rel_type: str, target: str):
+        self._record("edge", source, rel_type, target)
+
+    def add_edges(self, edges: Iterable[dict]):
+        """Ajoute des arêtes au format {source, target, type[, source_type, target_type]}."""
+        for edge in edges:
+            if "source_type" in edge:
+                self.add_node(edge["source"], edge["source_type"])
+                self.add_node(edge["target"], edge["target_type"])
+            self.add_edge(edge["source"], edge["type"], edge["target"])
+
+    def remove_node(self, node_id: str):
+        self._record("remove", node_id)
+
+    def clear(self):
+        self._record("clear")
+
+    # ===== Plus courts chemins =====
+
+    def _neighbors(self, node_id: str, direction: str, types: Optional[Set[str]]):
+        """Voisins (type, voisin, arête orientée) dans la direction demandée."""
+        if direction in ("out", "both"):
+            for rel_type, target in self._out.get(node_id, ()):
+                if types is None or rel_type in types:
+                    yield target, (node_id, rel_type, target)
+        if direction in ("in", "both"):
+            for rel_type, source in self._in.get(node_id, ()):
+                if types is None or rel_type in types:
+                    yield source, (source, rel_type, node_id)
+
+    def shortest_paths(
+        self,
+        source: str,
+        target: str,
+        types: Optional[Set[str]] = None,
+        direction: str = "both",
+        max_depth: int = 6,
+        limit: int = 10,
+    ) -> List[dict]:
+        """
+        BFS bidirectionnel par couches : on étend toujours la frontière la plus petite,
+        et on s'arrête à la première couche où les deux recherches se rencontrent.
+        Tous les plus courts chemins (jusqu'à `limit`) sont reconstruits via les parents.
+
+        Returns:
+            Liste de {nodes: [{id, type}], edges: [{source, target, type}]}
+        """
+        reverse = {"out": "in", "in": "out", "both": "both"}[direction]
+        with self._lock:
+            if source == target:
+                return [{"nodes": [{"id": source, "type": self._types.get(source)}], "edges": []}] \
+                    if source in self._types else []
+
+            # parents[côté][nœud] = liste de (parent, arête)
+            parents = ({source: []}, {target: []})
+            dist = ({source: 0}, {target: 0})
+            frontiers = ([source], [target])
+            depths = [0, 0]
+            meeting: Set[str] = set()
+
+            while frontiers[0] and frontiers[1] and depths[0] + depths[1] < max_depth:
+                side = 0 if len(frontiers[0]) <= len(frontiers[1]) else 1
+                step_direction = direction if side == 0 else reverse
+                seen, other = parents[side], parents[1 - side]
+                layer: Dict[str, list] = {}
+                for node_id in frontiers[side]:
+                    for neighbor, edge in self._neighbors(node_id, step_direction, types):
+                        if neighbor in seen:
+                            continue
+                        layer.setdefault(neighbor, []).append((node_id, edge))
+                seen.update(layer)
+                depths[side] += 1
+                dist[side].update(dict.fromkeys(layer, depths[side]))
+                frontiers = (list(layer), frontiers[1]) if side == 0 else (frontiers[0], list(layer))
+                meeting = {node_id for node_id in layer if node_id in other}
+                if meeting:
+                    break
+
+            if not meeting:
+                return []
+            # Ne garde que les points de rencontre de longueur totale minimale
+            best = min(dist[0][m] + dist[1][m] for m in meeting)
+            meeting = {m for m in meeting if dist[0][m] + dist[1][m] == best}
+
+            paths: List[dict] = []
+            for middle in sorted(meeting):
+                for head in self._walk(parents[0], middle, limit - len(paths)):
+                    for tail in self._walk(parents[1], middle, limit - len(paths)):
+                        nodes = [n for n, _ in reversed(head)] + [n for n, _ in tail[1:]]
+                        edges = [e for _, e in reversed(head) if e] + [e for _, e in tail if e]
+                        paths.append({
+                            "nodes": [{"id": n, "type": self._types.get(n)} for n in nodes],
+                            "edges": [{"source": s, "type": t, "target": d} for s, t, d in edges],
+                        })
+                        if len(paths) >= limit:
+                            return paths
+            return paths
+
+    def _walk(self, parents: Dict[str, list], start: str, limit: int) -> List[List[tuple]]:
+        """Énumère les chaînes [(nœud, arête vers le parent)] de `start` jusqu'à la racine."""
+        chains: List[List[tuple]] = []
+        stack = [[(start, None)]]
+        while stack and len(chains) < limit:
+            chain = stack.pop()
+            node_id = chain[-1][0]
+            if not parents.get(node_id):
+                chains.append(chain)
+                continue
+            for parent, edge in parents[node_id]:
+                stack.append(chain[:-1] + [(node_id, edge), (parent, None)])
+        return chains
+
+
+# Un index par tenant, alimenté par les routes d'écriture
+adjacency = TenantRegistry(AdjacencyIndex)
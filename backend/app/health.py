@@ -0,0 +1,95 @@
+"""
+Health Module - Sonde de santé Neo4j en arrière-plan
+Un thread interroge Neo4j à intervalle fixe et met le résultat en cache :
+/api/health sert ce cache au lieu d'envoyer une requête à chaque probe de l'orchestrateur.
+"""
+
+from typing import Any, Dict, Optional
+import os
+import threading
+import time
+
+from .neo4j_client import run_query
+
+# Intervalle entre deux sondes (secondes)
+HEALTH_PROBE_INTERVAL = float(os.getenv("HEALTH_PROBE_INTERVAL", "5"))
+# Âge maximal d'un résultat en cache avant qu'il soit considéré comme périmé (secondes)
+HEALTH_MAX_STALENESS = float(os.getenv("HEALTH_MAX_STALENESS", "15"))
+
+
+def check_database() -> Dict[str, Any]:
+    """
+    Exécute une vérification directe de Neo4j (RETURN 1).
+
+    Returns:
+        Dictionnaire {ok, latency_ms, error, checked_at}
+    """
+    started = time.monotonic()
+    try:
+        result = run_query("RETURN 1 AS ok", write=False)
+        ok = bool(result)
+        error = None if ok else "Neo4j non réactif"
+    except Exception as e:
+        ok = False
+        error = str(e)
+    return {
+        "ok": ok,
+        "latency_ms": round((time.monotonic() - started) * 1000, 2),
+        "error": error,
+        "checked_at": time.time(),
+    }
+
+
+class HealthProber:
+    """
+    Sonde périodique exécutée dans un thread démon.
+    Le dernier résultat est lisible sans verrou (remplacement atomique de la référence).
+    """
+
+    def __init__(self, interval: float = HEALTH_PROBE_INTERVAL):
+        self.interval = interval
+        # (résultat, horodatage monotone) remplacés ensemble
+        self._last: Optional[tuple] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        """Démarre le thread de sonde (idempotent)."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="health-prober", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread de sonde."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 1)
+            self._thread = None
+
+    def probe_now(self) -> Dict[str, Any]:
+        """Exécute une sonde immédiatement et met à jour le cache."""
+        result = check_database()
+        self._last = (result, time.monotonic())
+        return result
+
+    def cached(self) -> Optional[Dict[str, Any]]:
+        """
+        Retourne le dernier résultat avec son âge, ou None si aucune sonde n'a encore abouti.
+        """
+        last = self._last
+        if last is None:
+            return None
+        result, probed_at = last
+        age = time.monotonic() - probed_at
+        return {**result, "age_s": round(age, 3), "stale": age > HEALTH_MAX_STALENESS}
+
+    def _loop(self):
+        while not self._stop.is_set():
+            self.probe_now()
+            self._stop.wait(self.interval)
+
+
+# Instance partagée, démarrée dans le lifespan de l'application
+prober = HealthProber()
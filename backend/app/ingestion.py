@@ -0,0 +1,336 @@
+"""
+Ingestion Module - Pipeline d'ingestion de texte par étapes
+Lecture en flux par blocs -> segmentation en phrases -> extraction d'entités par règles
+(Person, Topic, Issue) dans un pool de processus -> une écriture Neo4j groupée par bloc.
+La mémoire reste bornée : un tampon d'au plus un bloc et un nombre fixe de blocs en vol.
+"""
+
+from concurrent.futures import Future, ProcessPoolExecutor
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import threading
+import unicodedata
+import uuid
+
+from .neo4j_client import run_transaction
+from .tenancy import DEFAULT_TENANT, ensure_tenant_schema, ensure_type_schema, tenant_database, tenant_label
+from .graph_index import adjacency
+from .dag_index import dags
+from .vector_index import vectors
+
+# Taille cible d'un bloc de texte (caractères)
+INGEST_CHUNK_SIZE = int(os.getenv("INGEST_CHUNK_SIZE", "65536"))
+# Nombre de processus d'extraction (0 = extraction dans le processus courant)
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", str(min(os.cpu_count() or 1, 4))))
+# Fichier JSON optionnel {"Person": [...], "Topic": [...], "Issue": [...]}
+INGEST_GAZETTEER = os.getenv("INGEST_GAZETTEER", "")
+
+# Fin de phrase : ponctuation forte ou saut de ligne
+SENTENCE_END = re.compile(r"[.!?]+|\n+")
+
+# ===== Règles d'extraction =====
+NAME = r"([A-ZÀ-Ý][\w\-]+(?:\s+[A-ZÀ-Ý][\w\-]+)?)"
+PERSON_RULES = [
+    # Verbe insensible à la casse, nom propre avec majuscule
+    re.compile(r"\b(?i:assign|attribu|confi)\w*\s+(?:à|a)\s+" + NAME),
+    re.compile(r"\b(?i:responsable|owner)\s*:\s*" + NAME),
+    # Mention @nom : pas précédée d'un caractère de mot (adresse e-mail), ni suivie d'un domaine
+    re.compile(r"(?<![\w.\-])@([\w\-]+)(?![\w\-]|\.\w)"),
+]
+TOPIC_RULES = [
+    re.compile(r"#([\w\-]+)"),
+    re.compile(r"\b(?:sujet|thème|topic)\s*:\s*([^,;:]+)", re.IGNORECASE),
+]
+ISSUE_RULE = re.compile(
+    r"\b(?:problème|bug|incident|erreur|bloqu\w*|manquant\w*|retard)\b", re.IGNORECASE
+)
+
+
+def _load_gazetteer(path: str) -> Dict[str, re.Pattern]:
+    """Compile une alternance par type à partir du fichier gazetteer (si fourni)."""
+    if not path:
+        return {}
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    patterns = {}
+    for entity_type, names in entries.items():
+        names = sorted({name.strip() for name in names if name.strip()}, key=len, reverse=True)
+        if names:
+            patterns[entity_type] = re.compile(
+                r"\b(" + "|".join(re.escape(name) for name in names) + r")\b", re.IGNORECASE
+            )
+    return patterns
+
+
+# Chargé à l'import : chaque processus du pool a sa propre copie compilée
+GAZETTEER = _load_gazetteer(INGEST_GAZETTEER)
+
+
+def slugify(value: str) -> str:
+    """Normalise un nom en fragment d'ID compatible avec safe_node_id."""
+    value = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]+", "-", value.lower()).strip("-")[:64]
+
+
+def split_sentences(text: str) -> List[str]:
+    """Découpe un bloc en phrases non vides."""
+    return [s.strip() for s in SENTENCE_END.split(text) if s.strip()]
+
+
+def extract_entities(sentence: str) -> List[Dict[str, str]]:
+    """
+    Extrait les mentions Person, Topic et Issue d'une phrase.
+    Les IDs Person/Topic sont dérivés du nom : deux mentions fusionnent dans le même nœud.
+
+    Returns:
+        Liste de {id, type, content}
+    """
+    found: Dict[str, Dict[str, str]] = {}
+
+    def add(entity_type: str, name: str, node_id: Optional[str] = None):
+        name = name.strip()
+        slug = slugify(name)
+        if not slug:
+            return
+        node_id = node_id or f"{entity_type.lower()}-{slug}"
+        found.setdefault(node_id, {"id": node_id, "type": entity_type, "content": name})
+
+    for rule in PERSON_RULES:
+        for match in rule.finditer(sentence):
+            add("Person", match.group(1))
+    for rule in TOPIC_RULES:
+        for match in rule.finditer(sentence):
+            add("Topic", match.group(1))
+    for entity_type, pattern in GAZETTEER.items():
+        for match in pattern.finditer(sentence):
+            add(entity_type, match.group(1))
+    if ISSUE_RULE.search(sentence):
+        digest = hashlib.sha1(sentence.lower().encode("utf-8")).hexdigest()[:10]
+        add("Issue", sentence, node_id=f"issue-{digest}")
+    return list(found.values())
+
+
+# Relation créée entre la Task et chaque type d'entité mentionné
+ENTITY_EDGES = {
+    "Person": ("assigned_to", "entity_to_task"),
+    "Topic": ("about", "task_to_entity"),
+    "Issue": ("depends_on", "task_to_entity"),
+}
+
+
+def extract_chunk(text: str) -> Dict[str, List[dict]]:
+    """
+    Étape d'extraction (exécutée dans le pool) : un bloc -> Tasks, entités et arêtes.
+    Chaque phrase devient une Task qui dépend de la précédente dans le bloc.
+
+    Returns:
+        Dictionnaire {tasks, entities, edges}
+    """
+    tasks: List[dict] = []
+    entities: Dict[str, dict] = {}
+    edges: List[dict] = []
+
+    for sentence in split_sentences(text):
+        task_id = f"task-{uuid.uuid4().hex[:8]}"
+        if tasks:
+            edges.append({"source": task_id, "source_type": "Task", "target": tasks[-1]["id"],
+                          "target_type": "Task", "type": "depends_on"})
+        tasks.append({"id": task_id, "type": "Task", "content": sentence})
+
+        for entity in extract_entities(sentence):
+            if entity["type"] not in ENTITY_EDGES:
+                continue
+            entities.setdefault(entity["id"], entity)
+            rel_type, direction = ENTITY_EDGES[entity["type"]]
+            if direction == "entity_to_task":
+                edges.append({"source": entity["id"], "source_type": entity["type"], "target": task_id,
+                              "target_type": "Task", "type": rel_type})
+            else:
+                edges.append({"source": task_id, "source_type": "Task", "target": entity["id"],
+                              "target_type": entity["type"], "type": rel_type})
+
+    return {"tasks": tasks, "entities": list(entities.values()), "edges": edges}
+
+
+# ===== Écriture =====
+
+def write_chunk(extracted: Dict[str, List[dict]], agent: str, tenant: str = DEFAULT_TENANT):
+    """
+    Écrit un bloc extrait en une seule transaction (requêtes UNWIND groupées) dans le tenant.
+    Les Tasks écrasent leur contenu ; les entités ne sont créées que si absentes.
+    Labels et types de relation proviennent de l'ensemble fermé ENTITY_EDGES.
+    """
+    label = tenant_label(tenant)
+    entities_by_type: Dict[str, List[dict]] = {}
+    for entity in extracted["entities"]:
+        entities_by_type.setdefault(entity["type"], []).append(entity)
+
+    edges_by_shape: Dict[tuple, List[dict]] = {}
+    for edge in extracted["edges"]:
+        shape = (edge["source_type"], edge["type"], edge["target_type"])
+        edges_by_shape.setdefault(shape, []).append({"source": edge["source"], "target": edge["target"]})
+
+    def work(tx):
+        tx.run("""
+        UNWIND $rows AS row
+        MERGE (n:Task:{label} {{id: row.id}})
+        SET n.content = row.content, n.agent = $agent, n.tenant = $tenant, n.created_at = timestamp()
+        """.format(label=label), {"rows": extracted["tasks"], "agent": agent, "tenant": tenant})
+
+        for entity_type, rows in entities_by_type.items():
+            tx.run("""
+            UNWIND $rows AS row
+            MERGE (n:{type}:{label} {{id: row.id}})
+            ON CREATE SET n.content = row.content, n.agent = $agent, n.tenant = $tenant, n.created_at = timestamp()
+            """.format(type=entity_type, label=label), {"rows": rows, "agent": agent, "tenant": tenant})
+
+        for (source_type, rel_type, target_type), rows in edges_by_shape.items():
+            tx.run("""
+            UNWIND $rows AS row
+            MATCH (a:{source_type}:{label} {{id: row.source}}), (b:{target_type}:{label} {{id: row.target}})
+            MERGE (a)-[r:{type}]->(b)
+            ON CREATE SET r.created_at = timestamp(), r.tenant = $tenant, r.agent = $agent
+            """.format(source_type=source_type, type=rel_type, target_type=target_type, label=label), {
+                "rows": rows, "agent": agent, "tenant": tenant
+            })
+
+    ensure_tenant_schema(tenant)
+    for entity_type in ["Task", *entities_by_type]:
+        ensure_type_schema("node", entity_type, tenant)
+    for _, rel_type, _ in edges_by_shape:
+        ensure_type_schema("edge", rel_type, tenant)
+    run_transaction(work, database=tenant_database(tenant))
+
+
+# ===== Pool de processus =====
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> Optional[ProcessPoolExecutor]:
+    """Retourne le pool d'extraction (créé au premier usage), ou None si INGEST_WORKERS=0."""
+    global _pool
+    if INGEST_WORKERS <= 0:
+        return None
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                # Pas de fork : le serveur est multithreadé (driver, sonde, index, journal) et un
+                # enfant forké pourrait hériter d'un verrou tenu au moment du fork
+                _pool = ProcessPoolExecutor(
+                    max_workers=INGEST_WORKERS, mp_context=multiprocessing.get_context("forkserver")
+                )
+    return _pool
+
+
+def shutdown_pool():
+    """Arrête le pool d'extraction (appelé au shutdown de l'application)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+# ===== Pipeline =====
+
+class IngestionPipeline:
+    """
+    Pipeline en flux : feed() reçoit du texte par morceaux, close() termine l'ingestion.
+    Les blocs sont extraits en parallèle mais écrits dans l'ordre, pour chaîner les Tasks
+    d'un bloc à l'autre (depends_on). Au plus `max_in_flight` blocs sont en attente.
+    """
+
+    def __init__(
+        self,
+        agent: str = "AI",
+        tenant: str = DEFAULT_TENANT,
+        chunk_size: int = INGEST_CHUNK_SIZE,
+        collect_nodes: bool = False,
+    ):
+        self.agent = agent
+        self.tenant = tenant
+        self.chunk_size = chunk_size
+        self.collect_nodes = collect_nodes
+        self.pool = get_pool()
+        self.max_in_flight = 2 * INGEST_WORKERS if self.pool else 1
+        self._buffer = ""
+        self._in_flight: Deque[Future] = deque()
+        self._last_task_id: Optional[str] = None
+        self.created_nodes: List[dict] = []
+        self.stats = {"chunks": 0, "tasks": 0, "entities": 0, "edges": 0}
+
+    def feed(self, text: str):
+        """Ajoute du texte ; les blocs complets (coupés en fin de phrase) partent à l'extraction."""
+        self._buffer += text
+        while len(self._buffer) >= self.chunk_size:
+            cut = self._find_cut(self._buffer)
+            if cut is None:
+                break
+            chunk, self._buffer = self._buffer[:cut], self._buffer[cut:]
+            self._submit(chunk)
+
+    def close(self) -> Dict[str, Any]:
+        """Envoie le reste du tampon, attend tous les blocs et retourne les statistiques."""
+        if self._buffer.strip():
+            # Texte court en un seul bloc : extraction locale, sans aller-retour vers le pool
+            inline = not self._in_flight and self.stats["chunks"] == 0
+            self._submit(self._buffer, inline=inline)
+        self._buffer = ""
+        while self._in_flight:
+            self._write_next()
+        return dict(self.stats)
+
+    def _find_cut(self, buffer: str) -> Optional[int]:
+        # Dernière fin de phrase dans le bloc ; sinon dernier espace si le tampon déborde trop
+        window = buffer[:self.chunk_size]
+        ends = [m.end() for m in SENTENCE_END.finditer(window)]
+        if ends:
+            return ends[-1]
+        if len(buffer) >= 4 * self.chunk_size:
+            space = window.rfind(" ")
+            return space + 1 if space > 0 else self.chunk_size
+        return None
+
+    def _submit(self, chunk: str, inline: bool = False):
+        if self.pool is not None and not inline:
+            future = self.pool.submit(extract_chunk, chunk)
+        else:
+            future = Future()
+            future.set_result(extract_chunk(chunk))
+        self._in_flight.append(future)
+        while len(self._in_flight) >= self.max_in_flight:
+            self._write_next()
+
+    def _write_next(self):
+        extracted = self._in_flight.popleft().result()
+        if not extracted["tasks"]:
+            return
+        # Chaîne la première Task du bloc à la dernière du bloc précédent
+        if self._last_task_id is not None:
+            extracted["edges"].append({
+                "source": extracted["tasks"][0]["id"], "source_type": "Task",
+                "target": self._last_task_id, "target_type": "Task", "type": "depends_on",
+            })
+        write_chunk(extracted, self.agent, self.tenant)
+        index = adjacency.get(self.tenant)
+        for node in extracted["tasks"] + extracted["entities"]:
+            index.add_node(node["id"], node["type"])
+        index.add_edges(extracted["edges"])
+        dags.get(self.tenant).add_edges(extracted["edges"])
+        vectors.get(self.tenant).add_many(extracted["tasks"] + extracted["entities"])
+        self._last_task_id = extracted["tasks"][-1]["id"]
+
+        self.stats["chunks"] += 1
+        self.stats["tasks"] += len(extracted["tasks"])
+        self.stats["entities"] += len(extracted["entities"])
+        self.stats["edges"] += len(extracted["edges"])
+        if self.collect_nodes:
+            for node in extracted["tasks"] + extracted["entities"]:
+                self.created_nodes.append({**node, "agent": self.agent})
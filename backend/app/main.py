@@ -3,24 +3,60 @@ Main Module - Point d'entrée FastAPI pour Enterprise Brain
 Initialise l'app, intègre les routes et lance le serveur Uvicorn.
 """
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+import asyncio
+import os
 
 from .routes import router as graph_router
-from .neo4j_client import close_driver
+from .neo4j_client import get_driver, warm_up, close_driver, set_deadline, reset_deadline, NEO4J_WARMUP_TIMEOUT
+from .health import prober
+from .snapshot import snapshots
+from .ingestion import shutdown_pool
+from .graph_index import adjacency
+from .dag_index import dags
+from .vector_index import vectors
+from .write_buffer import write_buffer
+from .retention import sweeper
+from .profiling import PROFILING_ENABLED, wants_profile, profile_request
 
 # ===== Lifecycle Events =====
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """
     Gère le cycle de vie de l'application.
-    - Startup: rien à faire, Neo4j driver déjà initialisé
-    - Shutdown: ferme le driver Neo4j
+    - Startup: crée le driver Neo4j, pré-remplit le pool, démarre la sonde de santé,
+      le gestionnaire de snapshots (si GRAPH_SNAPSHOT_DIR est défini), les index en mémoire
+      et le balayeur de rétention (si RETENTION_POLICIES est défini)
+    - Shutdown: arrête les tâches de fond, le pool d'ingestion et ferme le driver Neo4j
     """
-    print("[INFO] Enterprise Brain backend démarré")
+    get_driver()
+    # Warm-up dans un thread pour ne pas bloquer la boucle, borné : un Neo4j injoignable
+    # ne retarde pas le démarrage (le thread finit en arrière-plan)
+    try:
+        connections = await asyncio.wait_for(asyncio.to_thread(warm_up), timeout=NEO4J_WARMUP_TIMEOUT)
+    except asyncio.TimeoutError:
+        connections = 0
+        print(f"[Neo4j Warm-up] Abandon après {NEO4J_WARMUP_TIMEOUT:.0f}s : démarrage sans pool pré-rempli")
+    prober.start()
+    snapshots.start()
+    adjacency.start()
+    dags.start()
+    vectors.start()
+    write_buffer.start()
+    sweeper.start()
+    print(f"[INFO] Enterprise Brain backend démarré ({connections} connexions Neo4j prêtes)")
     yield
     print("[INFO] Fermeture du backend...")
+    sweeper.stop()
+    prober.stop()
+    snapshots.stop()
+    adjacency.stop()
+    dags.stop()
+    write_buffer.stop()
+    shutdown_pool()
     close_driver()
 
 
@@ -47,6 +83,49 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# ===== Deadline par requête =====
+# Budget total d'une requête HTTP (secondes), réductible par le header X-Request-Timeout
+REQUEST_DEADLINE = float(os.getenv("REQUEST_DEADLINE", "30"))
+
+
+@app.middleware("http")
+async def request_deadline(request: Request, call_next):
+    """
+    Pose la deadline de la requête : chaque transaction Neo4j reçoit comme timeout serveur
+    le temps restant, et aucune retry n'est tentée au-delà.
+    Un X-Request-Timeout nul ou négatif est refusé (400) : il ne peut pas lever la deadline.
+    """
+    try:
+        requested = float(request.headers.get("X-Request-Timeout", REQUEST_DEADLINE))
+    except ValueError:
+        requested = REQUEST_DEADLINE
+    if not requested > 0:
+        return JSONResponse(status_code=400, content={"detail": "X-Request-Timeout doit être strictement positif"})
+    budget = min(requested, REQUEST_DEADLINE)
+    token = set_deadline(budget)
+    try:
+        return await call_next(request)
+    finally:
+        reset_deadline(token)
+
+
+# ===== Profilage par requête =====
+# Installé seulement si ADMIN_TOKEN est défini : aucun coût sinon
+if PROFILING_ENABLED:
+    @app.middleware("http")
+    async def request_profiling(request: Request, call_next):
+        """
+        Profile la requête si elle porte X-Profile: 1 (ou ?profile=1) et un X-Admin-Token valide.
+        Le nom du profil est renvoyé dans le header X-Profile-Id.
+        """
+        if not wants_profile(request.headers, request.query_params):
+            return await call_next(request)
+        async with profile_request(f"{request.method}-{request.url.path}") as sampler:
+            response = await call_next(request)
+        response.headers["X-Profile-Id"] = sampler.name
+        return response
+
+
 # ===== Routes Integration =====
 # Inclut les routes du graph avec préfixe /api
 app.include_router(graph_router)
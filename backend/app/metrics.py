@@ -0,0 +1,29 @@
+"""
+Metrics Module - Compteurs et jauges en mémoire du processus
+Registre minimal, thread-safe, exposé par /api/metrics.
+"""
+
+from typing import Any, Dict
+import threading
+
+_lock = threading.Lock()
+_counters: Dict[str, float] = {}
+_gauges: Dict[str, Any] = {}
+
+
+def incr(name: str, value: float = 1):
+    """Incrémente un compteur (créé à 0 au premier appel)."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name: str, value: Any):
+    """Fixe la valeur courante d'une jauge."""
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot() -> Dict[str, Dict[str, Any]]:
+    """Retourne une copie de tous les compteurs et jauges."""
+    with _lock:
+        return {"counters": dict(_counters), "gauges": dict(_gauges)}
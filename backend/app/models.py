@@ -17,6 +17,7 @@ class Node(BaseModel):
     type: str = Field(..., description="Type du nœud (Task, Person, Issue, Topic, Decision)")
     content: str = Field(..., description="Contenu/description du nœud")
     agent: Optional[str] = Field(default="user", description="Source du nœud (user, AI, seed)")
+    tenant: Optional[str] = Field(default=None, description="Tenant / workspace (défaut : DEFAULT_TENANT)")
     metadata: Optional[dict] = Field(default_factory=dict, description="Métadonnées additionnelles")
     
     class Config:
@@ -26,6 +27,7 @@ class Node(BaseModel):
                 "type": "Task",
                 "content": "Préparer le plan Q2",
                 "agent": "AI",
+                "tenant": "default",
                 "metadata": {"priority": "high"}
             }
         }
@@ -38,6 +40,8 @@ class Edge(BaseModel):
     source: str = Field(..., description="ID du nœud source")
     target: str = Field(..., description="ID du nœud cible")
     type: str = Field(..., description="Type de relation (depends_on, assigned_to, about, based_on)")
+    agent: Optional[str] = Field(default="user", description="Source de la relation (user, AI, seed)")
+    tenant: Optional[str] = Field(default=None, description="Tenant des deux nœuds (défaut : DEFAULT_TENANT)")
     metadata: Optional[dict] = Field(default_factory=dict, description="Métadonnées additionnelles")
     
     class Config:
@@ -46,6 +50,8 @@ class Edge(BaseModel):
                 "source": "person-1",
                 "target": "task-1",
                 "type": "assigned_to",
+                "agent": "user",
+                "tenant": "default",
                 "metadata": {}
             }
         }
@@ -66,7 +72,7 @@ class UniformResponse(BaseModel):
     Réponse uniforme pour toutes les requêtes.
     Format : {"status": "ok", "data": {...}, "message": "..."}
     """
-    status: str = Field(..., description="ok, error, created, updated")
+    status: str = Field(..., description="ok, error, created, updated, pending")
     data: Optional[dict] = Field(default=None, description="Données retournées")
     message: Optional[str] = Field(default=None, description="Message optionnel")
     
@@ -86,6 +92,7 @@ class TextIngestionRequest(BaseModel):
     """
     text: str = Field(..., description="Texte à ingérer")
     agent: Optional[str] = Field(default="AI", description="Source de l'ingestion")
+    tenant: Optional[str] = Field(default=None, description="Tenant cible (défaut : DEFAULT_TENANT)")
 
 
 class NodeExplanationResponse(BaseModel):
@@ -96,3 +103,47 @@ class NodeExplanationResponse(BaseModel):
     causal_paths: List[List[dict]] = Field(default_factory=list, description="Chemins causaux")
     status: str = Field(default="ok", description="Statut")
 
+
+class PathResponse(BaseModel):
+    """
+    Réponse pour la recherche de plus courts chemins entre deux nœuds.
+    """
+    source: str = Field(..., description="ID du nœud de départ")
+    target: str = Field(..., description="ID du nœud d'arrivée")
+    paths: List[dict] = Field(default_factory=list, description="Chemins : {nodes, edges}")
+    length: Optional[int] = Field(default=None, description="Longueur (en arêtes) des plus courts chemins")
+    served_from: str = Field(default="index", description="index (mémoire) ou cypher (repli Neo4j)")
+    status: str = Field(default="ok", description="Statut")
+
+
+class ActivityResponse(BaseModel):
+    """
+    Réponse pour le fil d'activité (nœuds et arêtes, du plus récent au plus ancien).
+    """
+    events: List[dict] = Field(default_factory=list, description="Événements : {kind, id, type, agent, created_at, ...}")
+    next_cursor: Optional[str] = Field(default=None, description="Curseur de la page suivante (absent en fin de fil)")
+    status: str = Field(default="ok", description="Statut")
+
+
+class RetentionPolicy(BaseModel):
+    """
+    Politique de rétention : supprime les nœuds d'une source (agent) et d'un type
+    plus anciens que `older_than_days`, appliquée par le balayeur d'arrière-plan.
+    """
+    name: str = Field(..., description="Nom de la politique (métriques, rapports)")
+    agent: Optional[str] = Field(default=None, description="Source visée (AI, seed...) ; toutes si absent")
+    type: Optional[str] = Field(default=None, description="Type de nœud visé (Task, Person...) ; tous si absent")
+    older_than_days: float = Field(..., ge=0, description="Âge minimal (created_at) avant suppression, en jours")
+    keep_if_human_edges: bool = Field(default=True, description="Conserve les nœuds reliés par une arête humaine")
+    tenant: Optional[str] = Field(default=None, description="Tenant visé ; tous si absent")
+
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "name": "ai-placeholders",
+                "agent": "AI",
+                "type": "Person",
+                "older_than_days": 7,
+                "keep_if_human_edges": True
+            }
+        }
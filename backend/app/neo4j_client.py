@@ -1,24 +1,262 @@
 """
 Neo4j Client Module - Gestion sécurisée des requêtes à Neo4j
 Fournit une interface simple pour exécuter des requêtes avec paramètres et gestion erreurs.
+Le driver est créé paresseusement (au démarrage via lifespan ou au premier appel),
+jamais à l'import du module.
 """
 
-from neo4j import GraphDatabase, Session
+from neo4j import GraphDatabase, Driver, Session, Transaction, unit_of_work
+from neo4j.exceptions import DriverError, Neo4jError, ServiceUnavailable, SessionExpired, TransientError
+from contextvars import ContextVar
 from typing import Any, Dict, List, Optional
 import os
+import random
+import threading
+import time
+
+from . import metrics
 
 # Configuration de la connexion Neo4j
 NEO4J_URI = os.getenv("NEO4J_URI", "bolt://localhost:7687")
 NEO4J_USER = os.getenv("NEO4J_USER", "neo4j")
 NEO4J_PASSWORD = os.getenv("NEO4J_PASSWORD", "testpassword")
 
-# Instanciation du driver
-driver = GraphDatabase.driver(NEO4J_URI, auth=(NEO4J_USER, NEO4J_PASSWORD))
+# Nombre de connexions ouvertes à l'avance au démarrage (0 = pas de warm-up)
+NEO4J_WARMUP_CONNECTIONS = int(os.getenv("NEO4J_WARMUP_CONNECTIONS", "2"))
+# Attente maximale du warm-up au démarrage (secondes) : au-delà, le backend démarre sans l'attendre
+NEO4J_WARMUP_TIMEOUT = float(os.getenv("NEO4J_WARMUP_TIMEOUT", "5"))
+NEO4J_MAX_POOL_SIZE = int(os.getenv("NEO4J_MAX_POOL_SIZE", "100"))
+
+# Timeout serveur par transaction (secondes), réduit au temps restant avant la deadline
+NEO4J_QUERY_TIMEOUT = float(os.getenv("NEO4J_QUERY_TIMEOUT", "10"))
+# Retries sur erreurs transitoires : nombre max et backoff exponentiel (secondes)
+NEO4J_MAX_RETRIES = int(os.getenv("NEO4J_MAX_RETRIES", "3"))
+NEO4J_RETRY_BASE_DELAY = float(os.getenv("NEO4J_RETRY_BASE_DELAY", "0.1"))
+NEO4J_RETRY_MAX_DELAY = float(os.getenv("NEO4J_RETRY_MAX_DELAY", "2"))
+# Disjoncteur : échecs consécutifs avant ouverture, durée d'ouverture (secondes)
+NEO4J_CIRCUIT_THRESHOLD = int(os.getenv("NEO4J_CIRCUIT_THRESHOLD", "5"))
+NEO4J_CIRCUIT_RESET = float(os.getenv("NEO4J_CIRCUIT_RESET", "10"))
+
+# Driver partagé, créé à la demande par get_driver()
+_driver: Optional[Driver] = None
+_driver_lock = threading.Lock()
+
+
+def get_driver() -> Driver:
+    """
+    Retourne le driver Neo4j, en le créant au premier appel.
+    La création ne contacte pas la base : un Neo4j injoignable ne bloque donc pas l'import.
+    """
+    global _driver
+    if _driver is None:
+        with _driver_lock:
+            if _driver is None:
+                _driver = GraphDatabase.driver(
+                    NEO4J_URI,
+                    auth=(NEO4J_USER, NEO4J_PASSWORD),
+                    max_connection_pool_size=NEO4J_MAX_POOL_SIZE,
+                    # Les retries sont gérés par _execute (backoff, deadline, disjoncteur)
+                    max_transaction_retry_time=0,
+                )
+    return _driver
+
+
+def warm_up(connections: int = NEO4J_WARMUP_CONNECTIONS) -> int:
+    """
+    Ouvre `connections` connexions simultanées pour remplir le pool avant les premières requêtes.
+    Les erreurs sont loguées mais non propagées : le backend démarre même si Neo4j est absent.
+
+    Returns:
+        Nombre de connexions effectivement établies
+    """
+    if connections <= 0:
+        return 0
+
+    sessions: List[Session] = []
+    transactions: List[Transaction] = []
+    established = 0
+    try:
+        driver = get_driver()
+        # Une transaction explicite garde sa connexion jusqu'au rollback : elles sont toutes
+        # ouvertes avant d'en relâcher une, sinon le pool réutiliserait la même connexion
+        for _ in range(connections):
+            session = driver.session()
+            sessions.append(session)
+            tx = session.begin_transaction()
+            transactions.append(tx)
+            tx.run("RETURN 1").consume()
+            established += 1
+    except Exception as e:
+        print(f"[Neo4j Warm-up] {str(e)}")
+    finally:
+        for tx in transactions:
+            try:
+                tx.rollback()
+            except Exception as e:
+                print(f"[Neo4j Warm-up] {str(e)}")
+        for session in sessions:
+            session.close()
+    return established
+
+
+# ===== Exécution résiliente =====
+
+class DatabaseUnavailableError(Exception):
+    """Neo4j indisponible : circuit ouvert, ou erreurs transitoires après épuisement des retries."""
+
+
+class QueryTimeoutError(Exception):
+    """Deadline de la requête HTTP dépassée, ou transaction interrompue par le timeout serveur."""
+
+
+# Erreurs pour lesquelles une nouvelle tentative a un sens (avec celles que le driver déclare rejouables)
+RETRYABLE_ERRORS = (TransientError, ServiceUnavailable, SessionExpired)
+
+# Deadline absolue (horloge monotone) de la requête HTTP en cours, posée par le middleware
+_deadline: ContextVar[Optional[float]] = ContextVar("neo4j_deadline", default=None)
+
+
+def set_deadline(seconds: Optional[float]):
+    """Fixe la deadline de la requête courante (None = pas de deadline)."""
+    return _deadline.set(time.monotonic() + seconds if seconds else None)
+
+
+def reset_deadline(token):
+    """Restaure la deadline précédente (jeton retourné par set_deadline)."""
+    _deadline.reset(token)
+
+
+class CircuitBreaker:
+    """
+    Disjoncteur à trois états :
+    - closed : les requêtes passent ; `threshold` échecs consécutifs ouvrent le circuit
+    - open : rejet immédiat pendant `reset_timeout` secondes
+    - half_open : une seule requête d'essai ; succès -> closed, échec -> open
+    """
+
+    def __init__(self, threshold: int, reset_timeout: float):
+        self.threshold = threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == "open" and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._set_state("half_open")
+            if self.state == "closed":
+                return True
+            if self.state == "half_open" and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._trial_in_flight = False
+            if self.state != "closed":
+                self._set_state("closed")
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self.state == "half_open" or self._failures >= self.threshold:
+                self._opened_at = time.monotonic()
+                self._set_state("open")
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            print(f"[Neo4j Circuit] {self.state} -> {state}")
+            metrics.incr(f"neo4j.circuit_{state}")
+        self.state = state
+        metrics.set_gauge("neo4j.circuit_state", state)
+
+
+breaker = CircuitBreaker(NEO4J_CIRCUIT_THRESHOLD, NEO4J_CIRCUIT_RESET)
+
+
+def _is_retryable(error: Exception) -> bool:
+    """Erreur transitoire connue, ou signalée rejouable par le driver (NotALeader, base en lecture seule...)."""
+    if isinstance(error, RETRYABLE_ERRORS):
+        return True
+    return isinstance(error, Neo4jError) and error.is_retryable()
+
+
+def _is_timeout(error: Exception) -> bool:
+    return "TransactionTimedOut" in (getattr(error, "code", None) or "")
+
+
+def _execute(work, write: bool, database: Optional[str] = None) -> Any:
+    """
+    Exécute `work(tx)` dans une transaction gérée, avec :
+    - timeout serveur = min(NEO4J_QUERY_TIMEOUT, temps restant avant la deadline)
+    - retries avec backoff exponentiel (et jitter) sur les erreurs transitoires
+    - disjoncteur partagé qui rejette immédiatement quand Neo4j est en panne
+    """
+    attempt = 0
+    while True:
+        timeout = NEO4J_QUERY_TIMEOUT
+        deadline = _deadline.get()
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                metrics.incr("neo4j.deadline_exceeded")
+                raise QueryTimeoutError("Deadline de la requête dépassée")
+            timeout = min(timeout, remaining)
+
+        if not breaker.allow():
+            metrics.incr("neo4j.circuit_rejections")
+            raise DatabaseUnavailableError("Neo4j indisponible (circuit ouvert)")
+
+        metrics.incr("neo4j.transactions")
+        try:
+            with get_driver().session(database=database) as session:
+                execute = session.execute_write if write else session.execute_read
+                result = execute(unit_of_work(timeout=timeout)(work))
+        except Exception as e:
+            if _is_retryable(e):
+                breaker.record_failure()
+                metrics.incr("neo4j.transient_errors")
+                attempt += 1
+                delay = min(NEO4J_RETRY_MAX_DELAY, NEO4J_RETRY_BASE_DELAY * 2 ** (attempt - 1))
+                delay *= random.uniform(0.5, 1.0)
+                deadline = _deadline.get()
+                if attempt > NEO4J_MAX_RETRIES or (deadline is not None and time.monotonic() + delay >= deadline):
+                    print(f"[Neo4j Error] {str(e)} (abandon après {attempt} tentative(s))")
+                    raise DatabaseUnavailableError(str(e)) from e
+                metrics.incr("neo4j.retries")
+                time.sleep(delay)
+                continue
+            if isinstance(e, Neo4jError):
+                # Erreur côté requête : la base répond, le circuit reste fermé
+                breaker.record_success()
+                if _is_timeout(e):
+                    metrics.incr("neo4j.timeouts")
+                    raise QueryTimeoutError(f"Transaction interrompue après {timeout:.1f}s") from e
+                print(f"[Neo4j Error] {str(e)}")
+                raise
+            if isinstance(e, DriverError):
+                breaker.record_failure()
+                print(f"[Neo4j Error] {str(e)}")
+                raise DatabaseUnavailableError(str(e)) from e
+            # Erreur dans `work` (KeyError, TypeError...) : la base a répondu, et l'essai
+            # half_open doit être soldé, sinon le circuit ne se refermerait jamais
+            breaker.record_success()
+            raise
+        breaker.record_success()
+        return result
 
 
 def run_query(
     query: str, 
-    parameters: Optional[Dict[str, Any]] = None
+    parameters: Optional[Dict[str, Any]] = None,
+    write: bool = True,
+    database: Optional[str] = None
 ) -> List[Dict[str, Any]]:
     """
     Exécute une requête Cypher de manière sécurisée avec paramètres liés.
@@ -26,43 +264,40 @@ def run_query(
     Args:
         query: Requête Cypher avec placeholders ($param_name)
         parameters: Dictionnaire des paramètres
+        write: False pour une lecture (routée vers un lecteur en cluster)
+        database: Base Neo4j cible (None = base par défaut)
     
     Returns:
         Liste des résultats sous forme de dictionnaires
     
     Raises:
-        Exception: Levée en cas d'erreur Neo4j
+        DatabaseUnavailableError: Circuit ouvert ou retries épuisés
+        QueryTimeoutError: Deadline ou timeout serveur dépassé
+        Exception: Autres erreurs Neo4j (syntaxe, contraintes...)
     """
-    try:
-        with driver.session() as session:
-            # Utilise une transaction pour cohérence
-            result = session.run(query, parameters or {})
-            return result.data()
-    except Exception as e:
-        # Log l'erreur et propage
-        print(f"[Neo4j Error] {str(e)}")
-        raise
+    return _execute(lambda tx: tx.run(query, parameters or {}).data(), write, database)
 
 
-def run_transaction(callback) -> Any:
+def run_transaction(callback, write: bool = True, database: Optional[str] = None) -> Any:
     """
-    Exécute un callback dans une transaction.
+    Exécute un callback dans une transaction gérée (retries, timeout, disjoncteur).
+    Le callback peut être rejoué : il doit être idempotent (MERGE).
     
     Args:
-        callback: Fonction prenant une Session en paramètre
+        callback: Fonction prenant une ManagedTransaction en paramètre
+        write: False pour une transaction en lecture seule
+        database: Base Neo4j cible (None = base par défaut)
     
     Returns:
         Résultat retourné par le callback
     """
-    try:
-        with driver.session() as session:
-            return session.execute_write(callback)
-    except Exception as e:
-        print(f"[Neo4j Transaction Error] {str(e)}")
-        raise
+    return _execute(callback, write, database)
 
 
 def close_driver():
-    """Ferme la connexion au driver Neo4j."""
-    if driver:
-        driver.close()
+    """Ferme la connexion au driver Neo4j (s'il a été créé)."""
+    global _driver
+    with _driver_lock:
+        if _driver is not None:
+            _driver.close()
+            _driver = None
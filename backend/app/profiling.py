@@ -0,0 +1,297 @@
+"""
+Profiling Module - Profilage à la demande, réservé aux administrateurs
+Un échantillonneur lit les piles de tous les threads (sys._current_frames) à intervalle fixe
+et compte les piles repliées, au format "collapsed" de flamegraph.pl / speedscope.
+Deux modes :
+    - par requête : header X-Profile: 1 (ou ?profile=1) et X-Admin-Token ; seuls les threads
+      qui exécutent la requête (boucle asyncio et thread de l'endpoint) sont échantillonnés ;
+    - processus entier : POST /api/admin/profile?seconds=N, tous les threads actifs pendant N s.
+
+Sans ADMIN_TOKEN, rien n'est installé (ni middleware ni enveloppe d'endpoint) : coût nul.
+
+Fichiers (dans PROFILE_DIR) :
+    <nom>.collapsed : une pile par ligne "racine;...;feuille <échantillons>"
+    <nom>.json      : synthèse (fonctions les plus coûteuses en temps propre et cumulé)
+"""
+
+from collections import Counter
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Set
+import asyncio
+import functools
+import hmac
+import inspect
+import json
+import os
+import re
+import sys
+import threading
+import time
+import uuid
+
+from fastapi.routing import APIRoute
+
+from . import metrics
+
+# Jeton d'administration (vide = profilage désactivé, aucun hook installé)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+# Répertoire des profils
+PROFILE_DIR = os.getenv("PROFILE_DIR", "data/profiles")
+# Intervalle d'échantillonnage (secondes) : 10 ms, l'échantillonneur tient le GIL à chaque passage
+PROFILE_INTERVAL = float(os.getenv("PROFILE_INTERVAL", "0.01"))
+# Durée maximale d'un profil du processus entier (secondes)
+PROFILE_MAX_SECONDS = float(os.getenv("PROFILE_MAX_SECONDS", "60"))
+# Nombre de profils conservés sur disque
+PROFILE_KEEP = int(os.getenv("PROFILE_KEEP", "50"))
+
+PROFILING_ENABLED = bool(ADMIN_TOKEN)
+
+MAX_DEPTH = 128
+# Feuilles d'un thread bloqué en attente (exclu des échantillons)
+IDLE_FRAMES = {
+    ("threading.py", "wait"),
+    ("threading.py", "_wait_for_tstate_lock"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("thread.py", "_worker"),
+}
+_SAFE_NAME = re.compile(r"[^A-Za-z0-9_.-]+")
+
+
+def check_admin_token(token: Optional[str]) -> bool:
+    """Compare le jeton fourni à ADMIN_TOKEN (temps constant) ; toujours False si désactivé."""
+    if not ADMIN_TOKEN or not token:
+        return False
+    return hmac.compare_digest(token.encode("utf-8"), ADMIN_TOKEN.encode("utf-8"))
+
+
+# ===== Échantillonneur =====
+
+_labels: Dict[Any, str] = {}
+
+
+def _frame_label(code) -> str:
+    label = _labels.get(code)
+    if label is None:
+        path = code.co_filename.replace("\\", "/").split("/")
+        label = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+        _labels[code] = label
+    return label
+
+
+def _is_idle(frame) -> bool:
+    return (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES
+
+
+def _collapse(frame) -> str:
+    stack: List[str] = []
+    while frame is not None and len(stack) < MAX_DEPTH:
+        stack.append(_frame_label(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+class StackSampler:
+    """
+    Compte les piles des threads suivis (tous si `threads` vaut None) toutes les `interval` s.
+    Les threads en attente (verrous, select, file) ne sont pas comptés.
+    """
+
+    def __init__(self, name: str, threads: Optional[Set[int]] = None, interval: float = PROFILE_INTERVAL):
+        self.name = name
+        self.threads = threads
+        self.interval = interval
+        self.counts: Counter = Counter()
+        self.ticks = 0
+        self.started_at: Optional[float] = None
+        self.duration = 0.0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        self.started_at = time.monotonic()
+        self._thread = threading.Thread(target=self._run, name=f"profiler-{self.name}", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> Dict[str, Any]:
+        """Arrête l'échantillonnage, écrit les fichiers et retourne la synthèse."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.duration = time.monotonic() - self.started_at
+        summary = summarize(self.counts)
+        summary.update({"name": self.name, "duration_s": round(self.duration, 3), "ticks": self.ticks})
+        save_profile(self.name, self.counts, summary)
+        metrics.incr("profiling.profiles")
+        return summary
+
+    def _run(self):
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            frames = sys._current_frames()
+            if self.threads is None:
+                sampled = [frame for ident, frame in frames.items() if ident != own]
+            else:
+                # Mode requête : seules les piles des threads suivis sont parcourues
+                sampled = [frames[ident] for ident in tuple(self.threads) if ident in frames]
+            for frame in sampled:
+                if not _is_idle(frame):
+                    self.counts[_collapse(frame)] += 1
+            self.ticks += 1
+
+
+def summarize(counts: Counter, top: int = 25) -> Dict[str, Any]:
+    """Fonctions les plus présentes en feuille (temps propre) et dans les piles (temps cumulé)."""
+    samples = sum(counts.values())
+    own: Counter = Counter()
+    cumulative: Counter = Counter()
+    for stack, count in counts.items():
+        frames = stack.split(";")
+        own[frames[-1]] += count
+        for frame in set(frames):
+            cumulative[frame] += count
+
+    def pct(count: int) -> float:
+        return round(100.0 * count / samples, 1) if samples else 0.0
+
+    return {
+        "samples": samples,
+        "top_self": [
+            {"function": name, "samples": count, "pct": pct(count)} for name, count in own.most_common(top)
+        ],
+        "top_cumulative": [
+            {"function": name, "samples": count, "pct": pct(count)} for name, count in cumulative.most_common(top)
+        ],
+    }
+
+
+# ===== Fichiers =====
+
+def new_profile_name(label: str) -> str:
+    label = _SAFE_NAME.sub("_", label).strip("_")[:60] or "profile"
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{label}-{uuid.uuid4().hex[:6]}"
+
+
+def save_profile(name: str, counts: Counter, summary: Dict[str, Any]):
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    with open(os.path.join(PROFILE_DIR, f"{name}.collapsed"), "w", encoding="utf-8") as f:
+        for stack, count in counts.most_common():
+            f.write(f"{stack} {count}\n")
+    with open(os.path.join(PROFILE_DIR, f"{name}.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    _prune_profiles()
+
+
+def _prune_profiles(keep: int = PROFILE_KEEP):
+    names = list_profiles()
+    for name in names[keep:]:
+        for ext in (".collapsed", ".json"):
+            try:
+                os.remove(os.path.join(PROFILE_DIR, name + ext))
+            except FileNotFoundError:
+                pass
+
+
+def list_profiles() -> List[str]:
+    """Noms des profils disponibles, du plus récent au plus ancien."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    paths = [entry for entry in os.scandir(PROFILE_DIR) if entry.name.endswith(".collapsed")]
+    paths.sort(key=lambda entry: entry.stat().st_mtime, reverse=True)
+    return [entry.name[:-len(".collapsed")] for entry in paths]
+
+
+def read_profile(name: str, summary: bool = False) -> Optional[str]:
+    """Contenu brut d'un profil (piles repliées, ou synthèse JSON), None s'il n'existe pas."""
+    if _SAFE_NAME.search(name):
+        raise ValueError("Nom de profil invalide")
+    path = os.path.join(PROFILE_DIR, name + (".json" if summary else ".collapsed"))
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        return f.read()
+
+
+# ===== Profil du processus entier =====
+
+_process_lock = threading.Lock()
+
+
+def start_process_profile() -> Optional[StackSampler]:
+    """Démarre un profil de tous les threads ; None si un profil du processus est déjà en cours."""
+    if not _process_lock.acquire(blocking=False):
+        return None
+    sampler = StackSampler(new_profile_name("process"))
+    sampler.start()
+    return sampler
+
+
+def stop_process_profile(sampler: StackSampler) -> Dict[str, Any]:
+    try:
+        return sampler.stop()
+    finally:
+        _process_lock.release()
+
+
+# ===== Profil par requête =====
+
+# Échantillonneur de la requête en cours (propagé aux threads de l'endpoint par le contexte)
+_request_sampler: ContextVar[Optional[StackSampler]] = ContextVar("request_sampler", default=None)
+
+
+def wants_profile(headers, query_params) -> bool:
+    """True si la requête demande un profil et porte un jeton d'administration valide."""
+    flag = headers.get("X-Profile") or query_params.get("profile")
+    if flag not in ("1", "true"):
+        return False
+    return check_admin_token(headers.get("X-Admin-Token"))
+
+
+@asynccontextmanager
+async def profile_request(label: str):
+    """
+    Échantillonne le thread courant (boucle asyncio) et ceux que l'endpoint marque.
+    L'arrêt (join et écriture des fichiers) se fait hors de la boucle asyncio.
+    """
+    sampler = StackSampler(new_profile_name(label), threads={threading.get_ident()})
+    token = _request_sampler.set(sampler)
+    sampler.start()
+    try:
+        yield sampler
+    finally:
+        _request_sampler.reset(token)
+        await asyncio.to_thread(sampler.stop)
+
+
+def _track_thread(endpoint):
+    """Enveloppe un endpoint synchrone : le thread qui l'exécute rejoint le profil de la requête."""
+    if inspect.iscoroutinefunction(endpoint):
+        # Exécuté dans la boucle asyncio, déjà suivie par profile_request()
+        return endpoint
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        sampler = _request_sampler.get()
+        if sampler is None:
+            return endpoint(*args, **kwargs)
+        ident = threading.get_ident()
+        sampler.threads.add(ident)
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            sampler.threads.discard(ident)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """Route dont l'endpoint synchrone signale son thread au profil de la requête."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        super().__init__(path, endpoint=_track_thread(endpoint), **kwargs)
+
+
+# Classe de route du routeur /api : l'enveloppe n'existe que si le profilage est activé
+route_class = ProfiledRoute if PROFILING_ENABLED else APIRoute
@@ -0,0 +1,237 @@
+"""
+Retention Module - Expiration des nœuds générés (placeholders IA, Tasks ingérées...)
+Des politiques (agent, type, âge) sont appliquées par un thread d'arrière-plan qui supprime
+par petits lots, une transaction par lot, avec un débit maximal : le nettoyage ne provoque
+ni grosse transaction ni pic de latence. Les nœuds supprimés sont retirés des index en mémoire.
+
+Politiques (RETENTION_POLICIES : JSON en ligne ou chemin d'un fichier JSON), par exemple :
+    [{"name": "ai-placeholders", "agent": "AI", "type": "Person", "older_than_days": 7}]
+"""
+
+from typing import Dict, List, Optional
+import fcntl
+import json
+import os
+import threading
+import time
+
+from . import metrics
+from .models import RetentionPolicy
+from .neo4j_client import run_query, breaker
+from .tenancy import known_tenants, safe_tenant, safe_type, tenant_database, tenant_label
+from .graph_index import adjacency
+from .dag_index import dags
+from .vector_index import vectors
+from .snapshot import snapshots
+from .write_buffer import write_buffer
+
+# Politiques de rétention (vide = balayeur désactivé)
+RETENTION_POLICIES = os.getenv("RETENTION_POLICIES", "")
+# Intervalle entre deux balayages (secondes)
+RETENTION_INTERVAL = float(os.getenv("RETENTION_INTERVAL", "3600"))
+# Nœuds supprimés par transaction
+RETENTION_BATCH = int(os.getenv("RETENTION_BATCH", "200"))
+# Débit maximal de suppression (nœuds par seconde)
+RETENTION_MAX_RATE = float(os.getenv("RETENTION_MAX_RATE", "500"))
+# Agents dont les arêtes protègent un nœud (keep_if_human_edges)
+RETENTION_HUMAN_AGENTS = [a for a in os.getenv("RETENTION_HUMAN_AGENTS", "user").replace(" ", "").split(",") if a]
+# Verrou fichier élisant un seul balayeur entre workers (vide = chaque processus balaie)
+RETENTION_LOCK_FILE = os.getenv("RETENTION_LOCK_FILE", "")
+
+
+def parse_policies(raw) -> List[RetentionPolicy]:
+    """Valide une liste de politiques (JSON en ligne, chemin de fichier ou liste de dicts)."""
+    if isinstance(raw, str):
+        raw = raw.strip()
+        if not raw:
+            return []
+        if not raw.startswith("["):
+            with open(raw, encoding="utf-8") as f:
+                raw = f.read()
+        raw = json.loads(raw)
+    policies = [RetentionPolicy(**item) for item in raw]
+    for policy in policies:
+        if policy.type is not None:
+            safe_type(policy.type)
+        if policy.tenant is not None:
+            safe_tenant(policy.tenant)
+    return policies
+
+
+def _match_clause(policy: RetentionPolicy, tenant: str) -> str:
+    """
+    Motif des nœuds expirés d'un tenant. Avec un agent, l'index (agent, created_at)
+    du label de tenant borne le parcours ; les arêtes humaines (ou sans agent, antérieures
+    à l'horodatage des arêtes) sont comptées par une compréhension de motif.
+    """
+    labels = tenant_label(tenant) + (f":{policy.type}" if policy.type else "")
+    conditions = ["n.created_at < $cutoff"]
+    if policy.agent is not None:
+        conditions.insert(0, "n.agent = $agent")
+    if policy.keep_if_human_edges:
+        conditions.append(
+            "size([(n)-[r]-() WHERE r.agent IS NULL OR r.agent IN $human_agents | r]) = 0"
+        )
+    return f"MATCH (n:{labels}) WHERE " + " AND ".join(conditions)
+
+
+def _parameters(policy: RetentionPolicy) -> dict:
+    cutoff = int((time.time() - policy.older_than_days * 86400) * 1000)
+    return {"cutoff": cutoff, "agent": policy.agent, "human_agents": RETENTION_HUMAN_AGENTS}
+
+
+class RetentionSweeper:
+    """
+    Applique les politiques à intervalle fixe. Un balayage s'interrompt (et reprend au suivant)
+    si Neo4j devient indisponible ; il est sauté tant que des écritures attendent leur rejeu.
+    """
+
+    def __init__(self, policies: Optional[List[RetentionPolicy]] = None):
+        self.policies = policies if policies is not None else parse_policies(RETENTION_POLICIES)
+        self.last_sweep: Optional[dict] = None
+        self._sweep_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.policies)
+
+    def start(self):
+        """Démarre le thread de balayage (sans effet sans politique)."""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="retention-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le balayeur (le lot en cours se termine)."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=30)
+            self._thread = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _is_leader(self) -> bool:
+        if not RETENTION_LOCK_FILE or self._lock_fd is not None:
+            return True
+        fd = os.open(RETENTION_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        print(f"[INFO] Worker {os.getpid()} applique les politiques de rétention")
+        return True
+
+    def blocked_reason(self) -> Optional[str]:
+        """
+        Raison pour laquelle un balayage ne doit pas s'exécuter maintenant, ou None :
+        autre worker élu, Neo4j indisponible, ou écritures en attente de rejeu.
+        """
+        if not self._is_leader():
+            return "Un autre worker applique les politiques de rétention"
+        if breaker.state != "closed":
+            return "Neo4j indisponible (circuit non fermé)"
+        if write_buffer.pending:
+            return "Le journal local n'est pas encore rejoué"
+        return None
+
+    def _loop(self):
+        # Premier balayage après un intervalle : le démarrage reste léger
+        while not self._stop.wait(RETENTION_INTERVAL):
+            if not self._is_leader():
+                continue
+            if self.blocked_reason() is not None:
+                metrics.incr("retention.skipped")
+                continue
+            try:
+                self.sweep()
+            except Exception as e:
+                metrics.incr("retention.errors")
+                print(f"[Retention Error] {str(e)}")
+
+    # ===== Balayage =====
+
+    def sweep(self, dry_run: bool = False) -> Dict[str, int]:
+        """
+        Applique toutes les politiques à tous leurs tenants.
+        En dry_run, compte les nœuds concernés sans rien supprimer.
+
+        Returns:
+            Nombre de nœuds supprimés (ou concernés) par politique
+        """
+        with self._sweep_lock:
+            started = time.monotonic()
+            results: Dict[str, int] = {}
+            tenants = None
+            for policy in self.policies:
+                if policy.tenant is None and tenants is None:
+                    tenants = known_tenants()
+                for tenant in [policy.tenant] if policy.tenant else tenants:
+                    if self._stop.is_set():
+                        break
+                    count = self._count(policy, tenant) if dry_run else self._purge(policy, tenant)
+                    results[policy.name] = results.get(policy.name, 0) + count
+
+            if not dry_run:
+                duration = time.monotonic() - started
+                self.last_sweep = {"at": time.time(), "duration_s": round(duration, 3), "deleted": results}
+                metrics.incr("retention.sweeps")
+                metrics.set_gauge("retention.last_sweep_at", self.last_sweep["at"])
+                metrics.set_gauge("retention.last_sweep_duration_s", self.last_sweep["duration_s"])
+            return results
+
+    def _count(self, policy: RetentionPolicy, tenant: str) -> int:
+        result = run_query(
+            _match_clause(policy, tenant) + " RETURN count(n) AS count",
+            _parameters(policy), write=False, database=tenant_database(tenant)
+        )
+        return result[0]["count"] if result else 0
+
+    def _purge(self, policy: RetentionPolicy, tenant: str) -> int:
+        """Supprime par lots de RETENTION_BATCH, en respectant RETENTION_MAX_RATE."""
+        query = _match_clause(policy, tenant) + """
+        WITH n, n.id AS id LIMIT $batch
+        DETACH DELETE n
+        RETURN collect(id) AS ids
+        """
+        parameters = {**_parameters(policy), "batch": RETENTION_BATCH}
+        total = 0
+        while not self._stop.is_set():
+            started = time.monotonic()
+            result = run_query(query, parameters, database=tenant_database(tenant))
+            ids = result[0]["ids"] if result else []
+            if ids:
+                self._forget(tenant, ids)
+                total += len(ids)
+                metrics.incr("retention.batches")
+                metrics.incr("retention.deleted", len(ids))
+                metrics.incr(f"retention.deleted.{policy.name}", len(ids))
+            if len(ids) < RETENTION_BATCH:
+                break
+            # Limitation de débit : un lot de N nœuds occupe au moins N / RETENTION_MAX_RATE secondes
+            pause = len(ids) / RETENTION_MAX_RATE - (time.monotonic() - started)
+            if pause > 0:
+                self._stop.wait(pause)
+        if total:
+            print(f"[INFO] Rétention {policy.name} ({tenant}) : {total} nœuds supprimés")
+        return total
+
+    def _forget(self, tenant: str, ids: List[str]):
+        """Retire les nœuds supprimés des index en mémoire et du snapshot."""
+        index, dag = adjacency.get(tenant), dags.get(tenant)
+        for node_id in ids:
+            index.remove_node(node_id)
+            dag.remove_node(node_id)
+        vectors.get(tenant).remove(ids)
+        snapshots.mark_dirty(tenant)
+
+
+# Instance partagée, démarrée par le lifespan
+sweeper = RetentionSweeper()
@@ -2,21 +2,44 @@
 Routes Module - Endpoints FastAPI pour Enterprise Brain
 Fournit les endpoints de gestion du graph, ingestion, enrichissement IA et explications causales.
 TOUS les paramètres sont liés pour éviter l'injection Cypher.
+Chaque endpoint opère sur un seul tenant (champ `tenant` du corps ou paramètre ?tenant=).
 """
 
-from fastapi import APIRouter, HTTPException, status
+from fastapi import APIRouter, Header, HTTPException, Request, Response, status
+from fastapi.responses import PlainTextResponse
+from fastapi.concurrency import run_in_threadpool
 from typing import List, Optional
+import asyncio
+import codecs
+import json
 import uuid
 from datetime import datetime
 
 from .models import (
     Node, Edge, UniformResponse, GraphResponse, 
-    TextIngestionRequest, NodeExplanationResponse
+    TextIngestionRequest, NodeExplanationResponse, PathResponse, ActivityResponse
 )
-from .neo4j_client import run_query
+from .neo4j_client import (
+    run_query, set_deadline, breaker, DatabaseUnavailableError, QueryTimeoutError, NEO4J_CIRCUIT_RESET
+)
+from . import metrics
+from .health import prober
+from .snapshot import snapshots, fetch_graph
+from .ingestion import IngestionPipeline, INGEST_CHUNK_SIZE, split_sentences
+from .graph_index import adjacency, DIRECTIONS
+from .dag_index import dags, IMPACT_DIRECTIONS
+from .vector_index import vectors
+from .write_buffer import write_buffer
+from .tenancy import (
+    safe_tenant, safe_type, tenant_label, tenant_database, node_type,
+    ensure_tenant_schema, ensure_type_schema, delete_tenant
+)
+from .activity import fetch_activity
+from . import profiling
+from .retention import sweeper
 
 # ===== Configuration du routeur =====
-router = APIRouter(prefix="/api", tags=["graph"])
+router = APIRouter(prefix="/api", tags=["graph"], route_class=profiling.route_class)
 
 
 # ===== HELPERS =====
@@ -32,6 +55,44 @@ def create_response(
     return UniformResponse(status=status_code, data=data, message=message)
 
 
+def server_error(e: Exception) -> HTTPException:
+    """
+    Convertit une exception inattendue en HTTPException.
+    Neo4j indisponible -> 503 (avec Retry-After), deadline dépassée -> 504, sinon 500.
+    """
+    if isinstance(e, DatabaseUnavailableError):
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(int(NEO4J_CIRCUIT_RESET))}
+        )
+    if isinstance(e, QueryTimeoutError):
+        return HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    return HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+
+
+def buffered_response(response: Response, op: str, payload: dict) -> UniformResponse:
+    """
+    Ajoute l'écriture au journal local et l'acquitte en 202 avec le statut "pending".
+    Elle sera rejouée dans l'ordre dès que Neo4j répondra.
+    """
+    seq = write_buffer.append(op, payload)
+    response.status_code = status.HTTP_202_ACCEPTED
+    return create_response(
+        status_code="pending",
+        data={"seq": seq, "pending": write_buffer.pending},
+        message="Neo4j indisponible : écriture mise en file, rejouée au retour de la base"
+    )
+
+
+def require_admin(token: Optional[str]):
+    """Vérifie le jeton d'administration : 404 si le profilage est désactivé, 403 si invalide."""
+    if not profiling.ADMIN_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if not profiling.check_admin_token(token):
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Jeton d'administration invalide")
+
+
 def safe_node_id(node_id: str) -> str:
     """Valide et nettoie les IDs de nœud (sécurité basique)."""
     if not node_id or len(node_id) > 255:
@@ -42,10 +103,17 @@ def safe_node_id(node_id: str) -> str:
     return node_id
 
 
+def safe_rel_type(rel_type: str) -> str:
+    """Valide un type de relation destiné à être injecté dans une requête Cypher."""
+    if not rel_type or len(rel_type) > 64 or not all(c.isalnum() or c == "_" for c in rel_type):
+        raise ValueError(f"Type de relation invalide : {rel_type!r}")
+    return rel_type
+
+
 # ===== ENDPOINTS CRUD =====
 
 @router.post("/add_node", response_model=UniformResponse)
-def add_node(node: Node) -> UniformResponse:
+def add_node(node: Node, response: Response) -> UniformResponse:
     """
     Crée ou met à jour un nœud dans le graph.
     UTILISE des paramètres liés pour éviter l'injection Cypher.
@@ -57,24 +125,36 @@ def add_node(node: Node) -> UniformResponse:
         Réponse uniforme avec le nœud créé
     """
     try:
-        # Valide l'ID
+        # Valide l'ID et le tenant
         node.id = safe_node_id(node.id)
+        node.type = safe_type(node.type)
+        node.tenant = tenant = safe_tenant(node.tenant)
+        
+        if write_buffer.should_buffer():
+            return buffered_response(response, "add_node", node.dict())
         
+        ensure_tenant_schema(tenant)
+        ensure_type_schema("node", node.type, tenant)
         # Crée/met à jour le nœud avec MERGE (idempotent)
         query = """
-        MERGE (n:{type} {{id: $id}})
-        SET n.content = $content, n.agent = $agent, n.created_at = timestamp()
-        RETURN n.id AS id, labels(n)[0] AS type, n.content AS content, n.agent AS agent
+        MERGE (n:{type}:{label} {{id: $id}})
+        SET n.content = $content, n.agent = $agent, n.tenant = $tenant, n.created_at = timestamp()
+        RETURN n.id AS id, {node_type} AS type, n.content AS content, n.agent AS agent
         """
-        # Injection sécurisée du type via F-string SEULEMENT pour type (constante contrôlée)
+        # Injection sécurisée du type et du label de tenant (constantes contrôlées)
         # Tous les autres paramètres sont liés
-        query = query.format(type=node.type)
+        query = query.format(type=node.type, label=tenant_label(tenant), node_type=node_type())
         
         result = run_query(query, {
             "id": node.id,
             "content": node.content,
-            "agent": node.agent
-        })
+            "agent": node.agent,
+            "tenant": tenant
+        }, database=tenant_database(tenant))
+        
+        adjacency.get(tenant).add_node(node.id, node.type)
+        vectors.get(tenant).add(node.id, node.type, node.content)
+        snapshots.mark_dirty(tenant)
         
         return create_response(
             status_code="created",
@@ -84,11 +164,13 @@ def add_node(node: Node) -> UniformResponse:
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        if write_buffer.accepts(e):
+            return buffered_response(response, "add_node", node.dict())
+        raise server_error(e)
 
 
 @router.post("/add_edge", response_model=UniformResponse)
-def add_edge(edge: Edge) -> UniformResponse:
+def add_edge(edge: Edge, response: Response) -> UniformResponse:
     """
     Crée une relation entre deux nœuds.
     
@@ -102,11 +184,18 @@ def add_edge(edge: Edge) -> UniformResponse:
         # Valide les IDs
         source_id = safe_node_id(edge.source)
         target_id = safe_node_id(edge.target)
+        edge.type = safe_type(edge.type)
+        edge.tenant = tenant = safe_tenant(edge.tenant)
+        label, database = tenant_label(tenant), tenant_database(tenant)
         
-        # Vérifie que les deux nœuds existent
-        check_query = "MATCH (a {id: $id}) RETURN a"
-        source_exists = run_query(check_query, {"id": source_id})
-        target_exists = run_query(check_query, {"id": target_id})
+        # En file, l'existence des nœuds n'est pas vérifiable : l'arête est ignorée au rejeu s'ils manquent
+        if write_buffer.should_buffer():
+            return buffered_response(response, "add_edge", edge.dict())
+        
+        # Vérifie que les deux nœuds existent dans le tenant
+        check_query = f"MATCH (a:{label} {{id: $id}}) RETURN a.id AS id"
+        source_exists = run_query(check_query, {"id": source_id}, write=False, database=database)
+        target_exists = run_query(check_query, {"id": target_id}, write=False, database=database)
         
         if not source_exists or not target_exists:
             raise HTTPException(
@@ -114,19 +203,27 @@ def add_edge(edge: Edge) -> UniformResponse:
                 detail="Source ou target node n'existe pas"
             )
         
-        # Crée la relation
+        # Crée la relation (horodatée à la création, pour le fil d'activité)
+        ensure_type_schema("edge", edge.type, tenant)
         query = """
-        MATCH (a {{id: $source}}), (b {{id: $target}})
+        MATCH (a:{label} {{id: $source}}), (b:{label} {{id: $target}})
         MERGE (a)-[r:{type}]->(b)
+        ON CREATE SET r.created_at = timestamp(), r.tenant = $tenant, r.agent = $agent
         RETURN a.id AS source, b.id AS target, type(r) AS type
         """
-        # Type injecté sécurisé (constante contrôlée)
-        query = query.format(type=edge.type)
+        # Type et label injectés sécurisés (constantes contrôlées)
+        query = query.format(type=edge.type, label=label)
         
         result = run_query(query, {
             "source": source_id,
-            "target": target_id
-        })
+            "target": target_id,
+            "tenant": tenant,
+            "agent": edge.agent
+        }, database=database)
+        
+        adjacency.get(tenant).add_edge(source_id, edge.type, target_id)
+        dags.get(tenant).add_edge(source_id, edge.type, target_id)
+        snapshots.mark_dirty(tenant)
         
         return create_response(
             status_code="created",
@@ -136,45 +233,37 @@ def add_edge(edge: Edge) -> UniformResponse:
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        if write_buffer.accepts(e):
+            return buffered_response(response, "add_edge", edge.dict())
+        raise server_error(e)
 
 
 # ===== ENDPOINTS DE LECTURE =====
 
 @router.get("/graph", response_model=GraphResponse)
-def get_graph() -> GraphResponse:
+def get_graph(tenant: Optional[str] = None):
     """
-    Récupère le graph complet (tous les nœuds et arêtes).
+    Récupère le graph complet d'un tenant (tous ses nœuds et arêtes).
     Endpoint optionnel pour rafraîchissement UI toutes les 2s.
+    En mode snapshot (GRAPH_SNAPSHOT_DIR), sert le JSON pré-sérialisé du fichier mappé.
+    
+    Args:
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
     
     Returns:
         GraphResponse avec nodes et edges
     """
     try:
-        # Récupère tous les nœuds
-        nodes_query = """
-        MATCH (n)
-        RETURN {
-            id: n.id,
-            type: labels(n)[0],
-            content: n.content,
-            agent: n.agent
-        } AS node
-        """
-        nodes_result = run_query(nodes_query)
-        nodes = [item['node'] for item in nodes_result]
-        
-        # Récupère toutes les arêtes
-        edges_query = """
-        MATCH (a)-[r]->(b)
-        RETURN {
-            source: a.id,
-            target: b.id,
-            type: type(r)
-        } AS edge
-        """
-        edges_result = run_query(edges_query)
-        edges = [item['edge'] for item in edges_result]
+        tenant = safe_tenant(tenant)
+        snapshot = snapshots.current(tenant)
+        if snapshot is not None:
+            return Response(
+                content=snapshot.graph_json(),
+                media_type="application/json",
+                headers={"X-Graph-Version": snapshot.version}
+            )
+
+        nodes, edges = fetch_graph(tenant)
         
         return GraphResponse(
             nodes=nodes,
@@ -182,34 +271,38 @@ def get_graph() -> GraphResponse:
             status="ok",
             message=f"Graph retourné : {len(nodes)} nœuds, {len(edges)} arêtes"
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        raise server_error(e)
 
 
 @router.get("/node/{node_id}", response_model=UniformResponse)
-def get_node(node_id: str) -> UniformResponse:
+def get_node(node_id: str, tenant: Optional[str] = None) -> UniformResponse:
     """
     Récupère les détails d'un nœud spécifique.
     
     Args:
         node_id: ID du nœud
+        tenant: Tenant du nœud (DEFAULT_TENANT si absent)
     
     Returns:
         Réponse uniforme avec les données du nœud
     """
     try:
         node_id = safe_node_id(node_id)
+        tenant = safe_tenant(tenant)
         
         query = """
-        MATCH (n {id: $id})
-        RETURN {
+        MATCH (n:{label} {{id: $id}})
+        RETURN {{
             id: n.id,
-            type: labels(n)[0],
+            type: {type},
             content: n.content,
             agent: n.agent
-        } AS node
-        """
-        result = run_query(query, {"id": node_id})
+        }} AS node
+        """.format(label=tenant_label(tenant), type=node_type())
+        result = run_query(query, {"id": node_id}, write=False, database=tenant_database(tenant))
         
         if not result:
             raise HTTPException(
@@ -225,16 +318,75 @@ def get_node(node_id: str) -> UniformResponse:
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        raise server_error(e)
+
+
+@router.get("/node/{node_id}/neighbors", response_model=UniformResponse)
+def get_neighbors(node_id: str, tenant: Optional[str] = None) -> UniformResponse:
+    """
+    Récupère un nœud et toutes ses arêtes incidentes (voisinage à 1 hop).
+    Servi depuis le snapshot mappé s'il est actif, sinon depuis Neo4j.
+    
+    Args:
+        node_id: ID du nœud
+        tenant: Tenant du nœud (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse uniforme avec le nœud et ses arêtes
+    """
+    try:
+        node_id = safe_node_id(node_id)
+        tenant = safe_tenant(tenant)
+        
+        snapshot = snapshots.current(tenant)
+        if snapshot is not None:
+            neighborhood = snapshot.neighborhood(node_id)
+        else:
+            query = """
+            MATCH (n:{label} {{id: $id}})
+            OPTIONAL MATCH (n)-[r]-(m)
+            RETURN {{
+                id: n.id,
+                type: {type},
+                content: n.content,
+                agent: n.agent
+            }} AS node,
+            [rel IN collect(r) WHERE rel IS NOT NULL | {{
+                source: startNode(rel).id,
+                target: endNode(rel).id,
+                type: type(rel)
+            }}] AS edges
+            """.format(label=tenant_label(tenant), type=node_type())
+            result = run_query(query, {"id": node_id}, write=False, database=tenant_database(tenant))
+            neighborhood = result[0] if result else None
+        
+        if neighborhood is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Node {node_id} non trouvé"
+            )
+        
+        return create_response(
+            status_code="ok",
+            data=neighborhood,
+            message=f"{len(neighborhood['edges'])} arêtes autour de {node_id}"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise server_error(e)
 
 
 # ===== ENDPOINTS D'INGESTION TEXTE =====
 
 @router.post("/ingest_text", response_model=UniformResponse)
-def ingest_text(req: TextIngestionRequest) -> UniformResponse:
+def ingest_text(req: TextIngestionRequest, response: Response) -> UniformResponse:
     """
-    Ingère du texte brut et crée des nœuds Task + edges depends_on automatiquement.
-    Format attendu : phrases séparées par des points.
+    Ingère du texte brut via le pipeline d'ingestion :
+    une Task par phrase (chaînées par depends_on), plus les Person, Topic et Issue
+    mentionnés (assigned_to, about, depends_on). Une transaction par bloc de texte.
     
     Args:
         req: TextIngestionRequest avec text et agent optionnel
@@ -242,104 +394,131 @@ def ingest_text(req: TextIngestionRequest) -> UniformResponse:
     Returns:
         Réponse avec les nœuds créés
     """
+    pipeline = None
     try:
         text = req.text.strip()
         if not text:
             raise ValueError("Texte vide")
         
-        # Parse les phrases
-        sentences = [s.strip() for s in text.split(".") if s.strip()]
-        if not sentences:
+        if not split_sentences(text[:INGEST_CHUNK_SIZE]):
             raise ValueError("Aucune phrase trouvée")
+        tenant = safe_tenant(req.tenant)
         
-        created_nodes = []
+        if write_buffer.should_buffer():
+            return buffered_response(response, "ingest_text", {"text": text, "agent": req.agent, "tenant": tenant})
         
-        # Crée un nœud par phrase
-        for i, sentence in enumerate(sentences):
-            # Génère un ID unique basé sur le contenu hash + index
-            node_id = f"task-{uuid.uuid4().hex[:8]}"
-            
-            query = """
-            MERGE (n:Task {id: $id})
-            SET n.content = $content, n.agent = $agent, n.created_at = timestamp()
-            RETURN n.id AS id, labels(n)[0] AS type, n.content AS content, n.agent AS agent
-            """
-            
-            result = run_query(query, {
-                "id": node_id,
-                "content": sentence,
-                "agent": req.agent
-            })
-            
-            node_data = result[0] if result else {
-                "id": node_id,
-                "type": "Task",
-                "content": sentence,
-                "agent": req.agent
-            }
-            created_nodes.append(node_data)
-            
-            # Crée une dépendance avec la phrase précédente
-            if i > 0:
-                prev_node_id = created_nodes[i - 1]["id"]
-                edge_query = """
-                MATCH (a {id: $source}), (b {id: $target})
-                MERGE (a)-[r:depends_on]->(b)
-                """
-                run_query(edge_query, {
-                    "source": node_id,
-                    "target": prev_node_id
-                })
+        pipeline = IngestionPipeline(agent=req.agent, tenant=tenant, collect_nodes=True)
+        pipeline.feed(text)
+        stats = pipeline.close()
+        created_nodes = pipeline.created_nodes
+        
+        snapshots.mark_dirty(tenant)
         
         return create_response(
             status_code="created",
-            data={"created_nodes": created_nodes, "count": len(created_nodes)},
+            data={"created_nodes": created_nodes, "count": len(created_nodes), "stats": stats},
             message=f"{len(created_nodes)} nœuds créés par ingestion texte"
         )
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        # Mise en file seulement si aucun bloc n'a été écrit (sinon doublons au rejeu)
+        if write_buffer.accepts(e) and pipeline is not None and not pipeline.stats["chunks"]:
+            return buffered_response(response, "ingest_text", {"text": text, "agent": req.agent, "tenant": tenant})
+        raise server_error(e)
+
+
+@router.post("/ingest_stream", response_model=UniformResponse)
+async def ingest_stream(request: Request, agent: str = "AI", tenant: Optional[str] = None) -> UniformResponse:
+    """
+    Ingère un document volumineux envoyé en corps brut (text/plain, UTF-8), lu en flux.
+    Même pipeline que /ingest_text, mais la mémoire reste bornée et seule la synthèse
+    est retournée (pas la liste des nœuds créés).
+    
+    Args:
+        request: Requête dont le corps est le texte à ingérer
+        agent: Source de l'ingestion
+        tenant: Tenant cible (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse avec les compteurs d'ingestion
+    """
+    try:
+        tenant = safe_tenant(tenant)
+        # Durée liée à la taille du corps : pas de deadline globale, le timeout
+        # par transaction (NEO4J_QUERY_TIMEOUT) s'applique toujours à chaque bloc
+        set_deadline(None)
+        pipeline = IngestionPipeline(agent=agent, tenant=tenant)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        async for data in request.stream():
+            # feed() peut bloquer (écriture Neo4j, attente du pool) : hors de la boucle asyncio
+            await run_in_threadpool(pipeline.feed, decoder.decode(data))
+        await run_in_threadpool(pipeline.feed, decoder.decode(b"", final=True))
+        stats = await run_in_threadpool(pipeline.close)
+        
+        if not stats["tasks"]:
+            raise ValueError("Aucune phrase trouvée")
+        
+        snapshots.mark_dirty(tenant)
+        
+        return create_response(
+            status_code="created",
+            data={"stats": stats},
+            message=f"{stats['tasks']} Tasks et {stats['entities']} entités ingérées"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise server_error(e)
 
 
 # ===== ENDPOINTS D'ENRICHISSEMENT IA =====
 
 @router.post("/ai_enrich", response_model=UniformResponse)
-def ai_enrich() -> UniformResponse:
+def ai_enrich(tenant: Optional[str] = None) -> UniformResponse:
     """
-    Analyse le graph et ajoute automatiquement des nodes/edges manquants.
+    Analyse le graph d'un tenant et ajoute automatiquement des nodes/edges manquants.
     Exemple :
     - Détecte les Tasks sans Person assignée -> crée Person
     - Détecte les Tasks sans Issue dépendante -> crée Issue
     
+    Args:
+        tenant: Tenant analysé (DEFAULT_TENANT si absent)
+    
     Returns:
         Réponse avec les nœuds/arêtes ajoutés
     """
     try:
+        tenant = safe_tenant(tenant)
+        label, database = tenant_label(tenant), tenant_database(tenant)
+        ensure_tenant_schema(tenant)
+        ensure_type_schema("node", "Person", tenant)
+        ensure_type_schema("edge", "assigned_to", tenant)
         added_nodes = []
         added_edges = []
         
         # 1. Trouve les Tasks sans Person assignée
         tasks_without_assignee = run_query("""
-        MATCH (t:Task)
+        MATCH (t:Task:{label})
         WHERE NOT (t)<-[:assigned_to]-(:Person)
         RETURN t.id AS id LIMIT 5
-        """)
+        """.format(label=label), database=database)
         
         for task in tasks_without_assignee:
             # Crée une Person fictive
             person_id = f"person-{uuid.uuid4().hex[:8]}"
             
             query = """
-            MERGE (p:Person {id: $id})
-            SET p.content = $content, p.agent = 'AI', p.created_at = timestamp()
-            RETURN p.id AS id, labels(p)[0] AS type, p.content AS content
-            """
+            MERGE (p:Person:{label} {{id: $id}})
+            SET p.content = $content, p.agent = 'AI', p.tenant = $tenant, p.created_at = timestamp()
+            RETURN p.id AS id, {type} AS type, p.content AS content
+            """.format(label=label, type=node_type("p"))
             
             result = run_query(query, {
                 "id": person_id,
-                "content": f"Assistant auto (task: {task['id'][:20]})"
-            })
+                "content": f"Assistant auto (task: {task['id'][:20]})",
+                "tenant": tenant
+            }, database=database)
             
             added_nodes.append(result[0] if result else {
                 "id": person_id,
@@ -349,19 +528,26 @@ def ai_enrich() -> UniformResponse:
             
             # Crée une relation assigned_to
             edge_query = """
-            MATCH (p {id: $person_id}), (t {id: $task_id})
+            MATCH (p:{label} {{id: $person_id}}), (t:{label} {{id: $task_id}})
             MERGE (p)-[r:assigned_to]->(t)
-            """
+            ON CREATE SET r.created_at = timestamp(), r.tenant = $tenant, r.agent = 'AI'
+            """.format(label=label)
             run_query(edge_query, {
                 "person_id": person_id,
-                "task_id": task['id']
-            })
+                "task_id": task['id'],
+                "tenant": tenant
+            }, database=database)
             
             added_edges.append({
                 "source": person_id,
                 "target": task['id'],
                 "type": "assigned_to"
             })
+            adjacency.get(tenant).add_node(person_id, "Person")
+            vectors.get(tenant).add(person_id, "Person", f"Assistant auto (task: {task['id'][:20]})")
+            adjacency.get(tenant).add_edge(person_id, "assigned_to", task['id'])
+        
+        snapshots.mark_dirty(tenant)
         
         return create_response(
             status_code="ok",
@@ -372,41 +558,45 @@ def ai_enrich() -> UniformResponse:
             },
             message=f"Graph enrichi : {len(added_nodes)} nœuds ajoutés"
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        raise server_error(e)
 
 
 # ===== ENDPOINTS D'EXPLICATION CAUSALE =====
 
 @router.get("/explain_node/{node_id}", response_model=NodeExplanationResponse)
-def explain_node(node_id: str) -> NodeExplanationResponse:
+def explain_node(node_id: str, tenant: Optional[str] = None) -> NodeExplanationResponse:
     """
     Retourne les chemins causaux d'un nœud (up à 2 hops en arrière).
     Permet de comprendre les dépendances et relations d'un nœud.
     
     Args:
         node_id: ID du nœud à expliquer
+        tenant: Tenant du nœud (DEFAULT_TENANT si absent)
     
     Returns:
         NodeExplanationResponse avec les chemins causaux
     """
     try:
         node_id = safe_node_id(node_id)
+        tenant = safe_tenant(tenant)
         
         # Requête pour trouver les chemins causaux (up to 2 hops backward)
         query = """
-        MATCH path = (target {id: $id})<-[:based_on|depends_on|assigned_to*1..2]-(source)
-        RETURN {
-            path_nodes: [node IN nodes(path) | {
+        MATCH path = (target:{label} {{id: $id}})<-[:based_on|depends_on|assigned_to*1..2]-(source)
+        RETURN {{
+            path_nodes: [node IN nodes(path) | {{
                 id: node.id,
-                type: labels(node)[0],
+                type: {type},
                 content: node.content
-            }],
+            }}],
             relationships: [rel IN relationships(path) | type(rel)]
-        } AS causal_info
-        """
+        }} AS causal_info
+        """.format(label=tenant_label(tenant), type=node_type("node"))
         
-        result = run_query(query, {"id": node_id})
+        result = run_query(query, {"id": node_id}, write=False, database=tenant_database(tenant))
         
         # Formate les résultats
         causal_paths = []
@@ -421,41 +611,390 @@ def explain_node(node_id: str) -> NodeExplanationResponse:
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        raise server_error(e)
+
+
+@router.get("/path", response_model=PathResponse)
+def find_path(
+    source: str,
+    target: str,
+    types: Optional[str] = None,
+    direction: str = "both",
+    max_depth: int = 6,
+    limit: int = 10,
+    tenant: Optional[str] = None
+) -> PathResponse:
+    """
+    Retourne le(s) plus court(s) chemin(s) entre deux nœuds.
+    Utilise l'index d'adjacence en mémoire (BFS bidirectionnel) ; tant que l'index
+    n'est pas chargé, se replie sur allShortestPaths côté Neo4j.
+    
+    Args:
+        source: ID du nœud de départ
+        target: ID du nœud d'arrivée
+        types: Types de relation autorisés, séparés par des virgules (tous si absent)
+        direction: out (source -> target), in (sens inverse) ou both
+        max_depth: Longueur maximale du chemin (1 à 15)
+        limit: Nombre maximal de chemins retournés (1 à 100)
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
+    
+    Returns:
+        PathResponse avec les chemins trouvés
+    """
+    try:
+        source = safe_node_id(source)
+        target = safe_node_id(target)
+        tenant = safe_tenant(tenant)
+        if direction not in DIRECTIONS:
+            raise ValueError(f"Direction invalide (attendu : {', '.join(DIRECTIONS)})")
+        if not 1 <= max_depth <= 15 or not 1 <= limit <= 100:
+            raise ValueError("max_depth doit être entre 1 et 15, limit entre 1 et 100")
+        rel_types = [safe_rel_type(t.strip()) for t in types.split(",") if t.strip()] if types else []
+        
+        index = adjacency.find(tenant)
+        if index is None:
+            # Tenant inexistant : aucun chemin, et aucun index créé
+            paths, served_from = [], "index"
+        elif source == target and not index.warm:
+            # allShortestPaths refuse un chemin de longueur nulle : comme l'index, le nœud seul s'il existe
+            query = "MATCH (n:{label} {{id: $id}}) RETURN n.id AS id, {type} AS type".format(
+                label=tenant_label(tenant), type=node_type()
+            )
+            nodes = run_query(query, {"id": source}, write=False, database=tenant_database(tenant))
+            paths = [{"nodes": nodes[:1], "edges": []}] if nodes else []
+            served_from = "cypher"
+        elif index.warm:
+            paths = index.shortest_paths(
+                source, target,
+                types=set(rel_types) or None,
+                direction=direction,
+                max_depth=max_depth,
+                limit=limit
+            )
+            served_from = "index"
+        else:
+            # Types validés et profondeur bornée : injection sûre dans le motif
+            pattern = "-[:{types}*..{depth}]-".format(types="|".join(rel_types), depth=max_depth) \
+                if rel_types else "-[*..{depth}]-".format(depth=max_depth)
+            pattern = {"out": pattern + ">", "in": "<" + pattern, "both": pattern}[direction]
+            query = """
+            MATCH (a:{label} {{id: $source}}), (b:{label} {{id: $target}})
+            MATCH p = allShortestPaths((a){pattern}(b))
+            RETURN [n IN nodes(p) | {{id: n.id, type: {type}}}] AS nodes,
+                   [r IN relationships(p) | {{source: startNode(r).id, type: type(r), target: endNode(r).id}}] AS edges
+            LIMIT $limit
+            """.format(pattern=pattern, label=tenant_label(tenant), type=node_type())
+            paths = run_query(
+                query, {"source": source, "target": target, "limit": limit},
+                write=False, database=tenant_database(tenant)
+            )
+            served_from = "cypher"
+        
+        return PathResponse(
+            source=source,
+            target=target,
+            paths=paths,
+            length=len(paths[0]["edges"]) if paths else None,
+            served_from=served_from,
+            status="ok"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise server_error(e)
+
+
+@router.get("/related/{node_id}", response_model=UniformResponse)
+def related_nodes(node_id: str, k: int = 10, tenant: Optional[str] = None) -> UniformResponse:
+    """
+    Retourne les nœuds dont le contenu est le plus proche de celui du nœud donné
+    (similarité cosinus sur l'index vectoriel local, sans requête Neo4j).
+    
+    Args:
+        node_id: ID du nœud de référence
+        k: Nombre de résultats (1 à 100)
+        tenant: Tenant du nœud (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse uniforme avec la liste {id, type, score}
+    """
+    try:
+        node_id = safe_node_id(node_id)
+        tenant = safe_tenant(tenant)
+        if not 1 <= k <= 100:
+            raise ValueError("k doit être entre 1 et 100")
+        
+        index = vectors.find(tenant)
+        related = index.related(node_id, k) if index is not None else None
+        if related is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Node {node_id} absent de l'index vectoriel"
+            )
+        
+        return create_response(
+            status_code="ok",
+            data={"node_id": node_id, "related": related},
+            message=f"{len(related)} nœuds similaires"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise server_error(e)
+
+
+@router.get("/activity", response_model=ActivityResponse)
+def get_activity(
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    agent: Optional[str] = None,
+    type: Optional[str] = None,
+    tenant: Optional[str] = None
+) -> ActivityResponse:
+    """
+    Fil d'activité récente : nœuds et arêtes créés, du plus récent au plus ancien.
+    Pagination par clé (created_at, id) : passer le `next_cursor` de la page précédente.
+
+    Args:
+        limit: Nombre d'événements par page (1 à 500)
+        cursor: Curseur retourné par la page précédente (absent = plus récents)
+        agent: Ne garde que les événements de cette source (user, AI, seed...)
+        type: Label de nœud (Task...) ou type de relation (depends_on...)
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
+
+    Returns:
+        ActivityResponse avec les événements et le curseur suivant
+    """
+    try:
+        tenant = safe_tenant(tenant)
+        if not 1 <= limit <= 500:
+            raise ValueError("limit doit être entre 1 et 500")
+
+        events, next_cursor = fetch_activity(tenant, limit=limit, cursor=cursor, agent=agent, type=type)
+
+        return ActivityResponse(events=events, next_cursor=next_cursor, status="ok")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except Exception as e:
+        raise server_error(e)
+
+
+# ===== ANALYSE DES DÉPENDANCES (depends_on) =====
+
+def dependency_dag(tenant: str):
+    """Index des dépendances du tenant, chargé à la demande s'il est encore froid (404 si tenant inexistant)."""
+    dag = dags.find(tenant)
+    if dag is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Tenant {tenant} inexistant")
+    dag.ensure_loaded()
+    return dag
+
+
+@router.get("/dag/order", response_model=UniformResponse)
+def get_dag_order(limit: int = 1000, tenant: Optional[str] = None) -> UniformResponse:
+    """
+    Ordre topologique des nœuds reliés par depends_on : prérequis d'abord.
+    En présence de cycles, les arcs qui les ferment sont ignorés (voir /api/dag/cycles).
+    
+    Args:
+        limit: Nombre maximal de nœuds retournés (1 à 100000)
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse uniforme avec l'ordre et les statistiques de l'index
+    """
+    try:
+        tenant = safe_tenant(tenant)
+        if not 1 <= limit <= 100000:
+            raise ValueError("limit doit être entre 1 et 100000")
+        
+        dag = dependency_dag(tenant)
+        order = dag.topological_order()
+        stats = dag.stats()
+        
+        return create_response(
+            status_code="ok",
+            data={"order": order[:limit], "count": len(order), "acyclic": stats["cycle_arcs"] == 0, "stats": stats},
+            message=f"{len(order)} nœuds ordonnés"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise server_error(e)
+
+
+@router.get("/dag/cycles", response_model=UniformResponse)
+def get_dag_cycles(tenant: Optional[str] = None) -> UniformResponse:
+    """
+    Cycles de dépendances : une entrée par composante fortement connexe, avec ses nœuds
+    et un cycle exemple (chaque nœud dépend du suivant).
+    
+    Args:
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse uniforme avec la liste des cycles
+    """
+    try:
+        tenant = safe_tenant(tenant)
+        cycles = dependency_dag(tenant).cycles()
+        
+        return create_response(
+            status_code="ok",
+            data={"cycles": cycles, "acyclic": not cycles},
+            message=f"{len(cycles)} cycles de dépendances"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise server_error(e)
+
+
+@router.get("/dag/impact/{node_id}", response_model=UniformResponse)
+def get_dag_impact(
+    node_id: str,
+    direction: str = "downstream",
+    limit: int = 1000,
+    tenant: Optional[str] = None
+) -> UniformResponse:
+    """
+    Impact d'un nœud : ce qu'il bloque (downstream, dépendants transitifs) ou ce qui le
+    bloque (upstream, prérequis transitifs), avec la distance en nombre d'arêtes.
+    
+    Args:
+        node_id: ID du nœud (ex: issue-1)
+        direction: downstream ou upstream
+        limit: Nombre maximal de nœuds retournés (1 à 100000)
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse uniforme avec le nombre total et la liste {id, depth}
+    """
+    try:
+        node_id = safe_node_id(node_id)
+        tenant = safe_tenant(tenant)
+        if direction not in IMPACT_DIRECTIONS:
+            raise ValueError(f"Direction invalide (attendu : {', '.join(IMPACT_DIRECTIONS)})")
+        if not 1 <= limit <= 100000:
+            raise ValueError("limit doit être entre 1 et 100000")
+        
+        impact = dependency_dag(tenant).impact(node_id, direction, limit)
+        if impact is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Node {node_id} sans dépendance"
+            )
+        
+        return create_response(
+            status_code="ok",
+            data={"node_id": node_id, "direction": direction, **impact},
+            message=f"{impact['count']} nœuds ({direction})"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise server_error(e)
+
+
+@router.get("/dag/critical_path", response_model=UniformResponse)
+def get_dag_critical_path(target: Optional[str] = None, tenant: Optional[str] = None) -> UniformResponse:
+    """
+    Chemin critique : plus longue chaîne de dépendances, prérequis d'abord.
+    Chaque étape est une liste de nœuds (plusieurs si l'étape est un cycle).
+    
+    Args:
+        target: Chaîne la plus longue se terminant à ce nœud (globale si absent)
+        tenant: Tenant interrogé (DEFAULT_TENANT si absent)
+    
+    Returns:
+        Réponse uniforme avec la longueur (en nœuds) et les étapes
+    """
+    try:
+        tenant = safe_tenant(tenant)
+        if target is not None:
+            target = safe_node_id(target)
+        
+        critical = dependency_dag(tenant).critical_path(target)
+        if critical is None:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Node {target} sans dépendance"
+            )
+        
+        return create_response(
+            status_code="ok",
+            data=critical,
+            message=f"Chemin critique de {critical['length']} nœuds"
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise server_error(e)
 
 
 # ===== ENDPOINTS D'ADMINISTRATION =====
 
 @router.post("/reset", response_model=UniformResponse)
-def reset_graph() -> UniformResponse:
+def reset_graph(tenant: Optional[str] = None) -> UniformResponse:
     """
-    Réinitialise le graph en supprimant tous les nœuds et relations.
+    Réinitialise le graph d'un tenant en supprimant tous ses nœuds et relations
+    (par lots de TENANT_DELETE_BATCH, les autres tenants ne sont pas touchés).
     ⚠️ DESTRUCTIF - À utiliser avec prudence en production.
     
+    Args:
+        tenant: Tenant à vider (DEFAULT_TENANT si absent)
+    
     Returns:
         Réponse de confirmation
     """
     try:
-        run_query("MATCH (n) DETACH DELETE n")
+        tenant = safe_tenant(tenant)
+        deleted = delete_tenant(tenant)
+        
+        for registry in (adjacency, vectors, dags):
+            index = registry.find(tenant)
+            if index is not None:
+                index.clear()
+        snapshots.mark_dirty(tenant)
         
         return create_response(
             status_code="ok",
-            message="Graph réinitialisé : tous les nœuds supprimés"
+            data={"tenant": tenant, "deleted": deleted},
+            message=f"Graph du tenant {tenant} réinitialisé : {deleted} nœuds supprimés"
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        raise server_error(e)
 
 
 @router.post("/seed", response_model=UniformResponse)
-def seed_graph() -> UniformResponse:
+def seed_graph(tenant: Optional[str] = None) -> UniformResponse:
     """
-    Remplit le graph avec des données de test pour démonstration.
+    Remplit le graph d'un tenant avec des données de test pour démonstration.
     Crée une structure complexe de Task, Person, Issue, Topic, Decision.
     
+    Args:
+        tenant: Tenant à remplir (DEFAULT_TENANT si absent)
+    
     Returns:
         Réponse avec le nombre de nœuds/arêtes créés
     """
     try:
+        tenant = safe_tenant(tenant)
+        label, database = tenant_label(tenant), tenant_database(tenant)
+        ensure_tenant_schema(tenant)
+        
         # Données de test
         seed_nodes = [
             {"id": "task-1", "type": "Task", "content": "Préparer le plan Q2"},
@@ -480,23 +1019,35 @@ def seed_graph() -> UniformResponse:
         
         # Insère les nœuds
         node_query = """
-        MERGE (n:{type} {{id: $id}})
-        SET n.content = $content, n.agent = 'seed', n.created_at = timestamp()
+        MERGE (n:{type}:{label} {{id: $id}})
+        SET n.content = $content, n.agent = 'seed', n.tenant = $tenant, n.created_at = timestamp()
         """
         
+        for node_type_name in {node['type'] for node in seed_nodes}:
+            ensure_type_schema("node", node_type_name, tenant)
+        for rel_type in {edge['type'] for edge in seed_edges}:
+            ensure_type_schema("edge", rel_type, tenant)
+        
         for node in seed_nodes:
-            query = node_query.format(type=node['type'])
-            run_query(query, node)
+            query = node_query.format(type=node['type'], label=label)
+            run_query(query, {**node, "tenant": tenant}, database=database)
+            adjacency.get(tenant).add_node(node['id'], node['type'])
+        vectors.get(tenant).add_many(seed_nodes)
         
         # Insère les arêtes
         edge_query = """
-        MATCH (a {{id: $source}}), (b {{id: $target}})
+        MATCH (a:{label} {{id: $source}}), (b:{label} {{id: $target}})
         MERGE (a)-[r:{type}]->(b)
+        ON CREATE SET r.created_at = timestamp(), r.tenant = $tenant, r.agent = 'seed'
         """
         
         for edge in seed_edges:
-            query = edge_query.format(type=edge['type'])
-            run_query(query, edge)
+            query = edge_query.format(type=edge['type'], label=label)
+            run_query(query, {**edge, "tenant": tenant}, database=database)
+            adjacency.get(tenant).add_edge(edge['source'], edge['type'], edge['target'])
+        dags.get(tenant).add_edges(seed_edges)
+        
+        snapshots.mark_dirty(tenant)
         
         return create_response(
             status_code="ok",
@@ -506,37 +1057,204 @@ def seed_graph() -> UniformResponse:
             },
             message=f"Seed inséré : {len(seed_nodes)} nœuds, {len(seed_edges)} arêtes"
         )
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
+        raise server_error(e)
 
 
 # ===== ENDPOINTS DE DIAGNOSTIQUE =====
 
 @router.get("/health", response_model=UniformResponse)
-def health_check() -> UniformResponse:
+def health_check(deep: bool = False) -> UniformResponse:
     """
     Vérifie la santé du backend et la connexion Neo4j.
+    Par défaut, sert le dernier résultat de la sonde d'arrière-plan (aucune requête Neo4j) ;
+    un résultat périmé (sonde bloquée) est signalé en 503 sans interroger Neo4j dans la requête.
+    Avec ?deep=true, interroge Neo4j directement et rafraîchit le cache.
+    
+    Args:
+        deep: Force une vérification directe de Neo4j
     
     Returns:
         Réponse avec le statut
     """
-    try:
-        # Teste la connexion Neo4j
-        result = run_query("RETURN 1")
-        
-        if result:
-            return create_response(
-                status_code="ok",
-                message="Backend et Neo4j OK"
-            )
-        else:
-            raise Exception("Neo4j non réactif")
-    except Exception as e:
+    if deep:
+        result = prober.probe_now()
+    else:
+        result = prober.cached()
+        # Aucune sonde encore aboutie (sonde non démarrée) : une vérification directe amorce le cache
+        if result is None:
+            result = prober.probe_now()
+
+    if not result["ok"]:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Health check failed: {result['error']}"
+        )
+    if result.get("stale"):
+        # La sonde d'arrière-plan rafraîchira le cache ; la requête n'attend pas Neo4j
         raise HTTPException(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-            detail=f"Health check failed: {str(e)}"
+            detail=f"Health check failed: dernière sonde il y a {result['age_s']:.0f}s"
+        )
+
+    return create_response(
+        status_code="ok",
+        data={"neo4j": result, "circuit": breaker.state},
+        message="Backend et Neo4j OK"
+    )
+
+
+@router.get("/metrics", response_model=UniformResponse)
+def get_metrics() -> UniformResponse:
+    """
+    Expose les compteurs du processus (transactions, retries, timeouts, disjoncteur...).
+    
+    Returns:
+        Réponse avec compteurs et jauges
+    """
+    return create_response(
+        status_code="ok",
+        data=metrics.snapshot()
+    )
+
+
+# ===== ENDPOINTS DE PROFILAGE (ADMIN) =====
+
+@router.post("/admin/profile", response_model=UniformResponse)
+async def profile_process(
+    seconds: float = 10,
+    x_admin_token: Optional[str] = Header(default=None)
+) -> UniformResponse:
+    """
+    Échantillonne les piles de tous les threads du processus pendant `seconds` secondes,
+    puis écrit le profil (piles repliées + synthèse) dans PROFILE_DIR.
+    Réservé aux administrateurs (header X-Admin-Token).
+    
+    Args:
+        seconds: Durée d'échantillonnage (bornée par PROFILE_MAX_SECONDS)
+    
+    Returns:
+        Réponse avec la synthèse (fonctions les plus coûteuses)
+    """
+    require_admin(x_admin_token)
+    if not 0 < seconds <= profiling.PROFILE_MAX_SECONDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"seconds doit être entre 0 et {profiling.PROFILE_MAX_SECONDS:g}"
         )
+    
+    sampler = profiling.start_process_profile()
+    if sampler is None:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail="Un profil du processus est déjà en cours")
+    try:
+        await asyncio.sleep(seconds)
+    finally:
+        summary = await run_in_threadpool(profiling.stop_process_profile, sampler)
+    
+    return create_response(
+        status_code="ok",
+        data=summary,
+        message=f"Profil {summary['name']} : {summary['samples']} échantillons"
+    )
+
+
+@router.get("/admin/profiles", response_model=UniformResponse)
+def list_profiles(x_admin_token: Optional[str] = Header(default=None)) -> UniformResponse:
+    """
+    Liste les profils disponibles (du plus récent au plus ancien).
+    
+    Returns:
+        Réponse avec les noms des profils
+    """
+    require_admin(x_admin_token)
+    names = profiling.list_profiles()
+    return create_response(status_code="ok", data={"profiles": names, "count": len(names)})
+
+
+@router.get("/admin/profiles/{name}")
+def get_profile(
+    name: str,
+    format: str = "collapsed",
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    """
+    Retourne un profil : piles repliées (format=collapsed, pour flamegraph.pl ou speedscope)
+    ou synthèse JSON (format=summary).
+    
+    Args:
+        name: Nom du profil (header X-Profile-Id ou /admin/profiles)
+        format: collapsed ou summary
+    
+    Returns:
+        Texte brut des piles, ou réponse uniforme avec la synthèse
+    """
+    require_admin(x_admin_token)
+    try:
+        if format not in ("collapsed", "summary"):
+            raise ValueError("format doit être collapsed ou summary")
+        content = profiling.read_profile(name, summary=format == "summary")
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    if content is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"Profil {name} non trouvé")
+    if format == "summary":
+        return create_response(status_code="ok", data=json.loads(content))
+    return PlainTextResponse(content)
+
 
+# ===== ENDPOINTS DE RÉTENTION (ADMIN) =====
 
+@router.get("/admin/retention", response_model=UniformResponse)
+def retention_status(x_admin_token: Optional[str] = Header(default=None)) -> UniformResponse:
+    """
+    Retourne les politiques de rétention actives et le résultat du dernier balayage.
+    
+    Returns:
+        Réponse avec policies et last_sweep
+    """
+    require_admin(x_admin_token)
+    return create_response(
+        status_code="ok",
+        data={
+            "policies": [policy.model_dump() for policy in sweeper.policies],
+            "last_sweep": sweeper.last_sweep
+        }
+    )
 
 
+@router.post("/admin/retention/sweep", response_model=UniformResponse)
+def retention_sweep(
+    dry_run: bool = True,
+    x_admin_token: Optional[str] = Header(default=None)
+) -> UniformResponse:
+    """
+    Lance un balayage immédiat (mêmes lots et même débit que le thread d'arrière-plan).
+    Par défaut en dry_run : compte les nœuds concernés sans les supprimer.
+    Une suppression réelle obéit aux mêmes gardes que le thread (worker élu, Neo4j disponible,
+    journal local rejoué) : 409 sinon.
+    
+    Args:
+        dry_run: False pour supprimer réellement
+    
+    Returns:
+        Réponse avec le nombre de nœuds par politique
+    """
+    require_admin(x_admin_token)
+    if not dry_run:
+        reason = sweeper.blocked_reason()
+        if reason is not None:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=reason)
+    try:
+        # Un balayage peut durer plus que le budget d'une requête : seul le timeout par lot s'applique
+        set_deadline(None)
+        results = sweeper.sweep(dry_run=dry_run)
+        return create_response(
+            status_code="ok",
+            data={"dry_run": dry_run, "results": results},
+            message=f"{sum(results.values())} nœuds {'concernés' if dry_run else 'supprimés'}"
+        )
+    except Exception as e:
+        raise server_error(e)
@@ -0,0 +1,375 @@
+"""
+Snapshot Module - Snapshot du graph partagé entre workers via mmap
+En mode multi-workers (uvicorn --workers N), un seul processus (élu par verrou fichier)
+interroge Neo4j et écrit un fichier snapshot en lecture seule, étiqueté par la version du graph.
+Tous les workers mappent ce fichier (mmap) et servent /api/graph et les voisinages depuis
+le page cache partagé, puis basculent atomiquement sur le nouveau fichier quand la version change.
+Un sous-répertoire (et un snapshot) par tenant existant, créé au premier accès au tenant.
+
+Format du fichier :
+    [en-tête][version utf-8][JSON GraphResponse][blocs voisinage JSON][index trié]
+    index = entrées (hash64 de l'id, offset, longueur) triées par hash, lues par recherche binaire.
+"""
+
+from typing import Any, Dict, List, Optional, Tuple
+import fcntl
+import hashlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+
+from .neo4j_client import run_query
+from .tenancy import DEFAULT_TENANT, node_type, tenant_database, tenant_exists, tenant_label
+
+# Répertoire des snapshots (vide = mode désactivé, lecture directe Neo4j)
+GRAPH_SNAPSHOT_DIR = os.getenv("GRAPH_SNAPSHOT_DIR", "")
+# Intervalle de vérification de la version du graph par le processus écrivain (secondes)
+GRAPH_SNAPSHOT_INTERVAL = float(os.getenv("GRAPH_SNAPSHOT_INTERVAL", "2"))
+# Nombre d'anciens snapshots conservés sur disque
+GRAPH_SNAPSHOT_KEEP = int(os.getenv("GRAPH_SNAPSHOT_KEEP", "2"))
+
+MAGIC = b"EBSNAP01"
+# magic, longueur version, réservé, offset graph, longueur graph, offset index, nb entrées index
+HEADER = struct.Struct("<8sIIQQQQ")
+# hash64 de l'id, offset du bloc, longueur du bloc
+INDEX_ENTRY = struct.Struct("<QQQ")
+POINTER_FILE = "CURRENT"
+LOCK_FILE = "writer.lock"
+
+
+# ===== Lecture Neo4j =====
+
+def fetch_graph(tenant: str = DEFAULT_TENANT) -> Tuple[List[dict], List[dict]]:
+    """
+    Récupère tous les nœuds et arêtes d'un tenant depuis Neo4j.
+
+    Returns:
+        Tuple (nodes, edges)
+    """
+    label, database = tenant_label(tenant), tenant_database(tenant)
+    nodes_query = """
+    MATCH (n:{label})
+    RETURN {{
+        id: n.id,
+        type: {type},
+        content: n.content,
+        agent: n.agent
+    }} AS node
+    """.format(label=label, type=node_type())
+    nodes = [item['node'] for item in run_query(nodes_query, write=False, database=database)]
+
+    edges_query = """
+    MATCH (a:{label})-[r]->(b)
+    RETURN {{
+        source: a.id,
+        target: b.id,
+        type: type(r)
+    }} AS edge
+    """.format(label=label)
+    edges = [item['edge'] for item in run_query(edges_query, write=False, database=database)]
+    return nodes, edges
+
+
+def graph_version(tenant: str = DEFAULT_TENANT) -> str:
+    """
+    Calcule une version bon marché du graph d'un tenant : nombre de nœuds, nombre d'arêtes
+    et dernier created_at (mis à jour par toutes les écritures de nœuds).
+    """
+    label, database = tenant_label(tenant), tenant_database(tenant)
+    nodes = run_query(
+        f"MATCH (n:{label}) RETURN count(n) AS count, max(n.created_at) AS last_write",
+        write=False, database=database
+    )
+    edges = run_query(f"MATCH (:{label})-[r]->() RETURN count(r) AS count", write=False, database=database)
+    node_row = nodes[0] if nodes else {"count": 0, "last_write": None}
+    edge_count = edges[0]["count"] if edges else 0
+    return f"{node_row['count']}-{edge_count}-{node_row['last_write']}"
+
+
+def _id_hash(node_id: str) -> int:
+    return int.from_bytes(hashlib.blake2b(node_id.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _dumps(data: Any) -> bytes:
+    return json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+# ===== Écriture du snapshot =====
+
+def write_snapshot(directory: str, version: str, nodes: List[dict], edges: List[dict]) -> str:
+    """
+    Écrit un snapshot complet dans un fichier temporaire puis le renomme (atomique).
+
+    Returns:
+        Nom du fichier snapshot créé
+    """
+    graph_bytes = _dumps({
+        "nodes": nodes,
+        "edges": edges,
+        "status": "ok",
+        "message": f"Graph retourné : {len(nodes)} nœuds, {len(edges)} arêtes",
+    })
+    version_bytes = version.encode("utf-8")
+
+    # Arêtes incidentes par nœud
+    incident: Dict[str, List[dict]] = {node["id"]: [] for node in nodes if node.get("id") is not None}
+    for edge in edges:
+        for end in (edge["source"], edge["target"]):
+            if end in incident:
+                incident[end].append(edge)
+
+    graph_offset = HEADER.size + len(version_bytes)
+    offset = graph_offset + len(graph_bytes)
+    blocks: List[bytes] = []
+    entries: List[Tuple[int, int, int]] = []
+    for node in nodes:
+        node_id = node.get("id")
+        if node_id is None:
+            continue
+        block = _dumps({"node": node, "edges": incident[node_id]})
+        entries.append((_id_hash(node_id), offset, len(block)))
+        blocks.append(block)
+        offset += len(block)
+    entries.sort()
+
+    name = f"graph-{hashlib.sha1(version_bytes).hexdigest()[:16]}.snap"
+    path = os.path.join(directory, name)
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(version_bytes), 0, graph_offset, len(graph_bytes), offset, len(entries)))
+        f.write(version_bytes)
+        f.write(graph_bytes)
+        for block in blocks:
+            f.write(block)
+        for entry in entries:
+            f.write(INDEX_ENTRY.pack(*entry))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+    # Bascule du pointeur (atomique) : les lecteurs voient l'ancien ou le nouveau fichier
+    pointer_tmp = os.path.join(directory, f"{POINTER_FILE}.tmp.{os.getpid()}")
+    with open(pointer_tmp, "w") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(pointer_tmp, os.path.join(directory, POINTER_FILE))
+    return name
+
+
+def _prune_snapshots(directory: str, current: str, keep: int = GRAPH_SNAPSHOT_KEEP):
+    """Supprime les anciens snapshots (les workers qui les ont encore mappés gardent l'accès)."""
+    snaps = sorted(
+        (entry for entry in os.scandir(directory) if entry.name.endswith(".snap") and entry.name != current),
+        key=lambda entry: entry.stat().st_mtime,
+        reverse=True,
+    )
+    for entry in snaps[max(keep - 1, 0):]:
+        try:
+            os.unlink(entry.path)
+        except FileNotFoundError:
+            pass
+
+
+# ===== Lecture du snapshot =====
+
+class MappedSnapshot:
+    """Snapshot mappé en mémoire, en lecture seule."""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version_len, _, graph_offset, graph_length, index_offset, index_count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Snapshot invalide : {path}")
+        self.version = self._mm[HEADER.size:HEADER.size + version_len].decode("utf-8")
+        self._graph = (graph_offset, graph_length)
+        self._index_offset = index_offset
+        self._index_count = index_count
+
+    def graph_json(self) -> memoryview:
+        """Retourne le JSON GraphResponse pré-sérialisé : vue sur le fichier mappé, sans copie."""
+        offset, length = self._graph
+        return memoryview(self._mm)[offset:offset + length]
+
+    def neighborhood(self, node_id: str) -> Optional[dict]:
+        """
+        Retourne {node, edges} pour un nœud, ou None s'il est absent du snapshot.
+        Recherche binaire directement dans l'index mappé (aucune structure chargée en mémoire).
+        """
+        target = _id_hash(node_id)
+        lo, hi = 0, self._index_count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, _, _ = INDEX_ENTRY.unpack_from(self._mm, self._index_offset + mid * INDEX_ENTRY.size)
+            if key < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        # Parcourt les éventuelles collisions de hash
+        while lo < self._index_count:
+            key, offset, length = INDEX_ENTRY.unpack_from(self._mm, self._index_offset + lo * INDEX_ENTRY.size)
+            if key != target:
+                break
+            block = json.loads(self._mm[offset:offset + length])
+            if block["node"]["id"] == node_id:
+                return block
+            lo += 1
+        return None
+
+
+class SnapshotManager:
+    """
+    Gère l'élection de l'écrivain, l'écriture périodique et la bascule des lecteurs.
+    Chaque worker possède une instance ; un seul détient le verrou d'écriture à la fois.
+    """
+
+    def __init__(self, directory: str = GRAPH_SNAPSHOT_DIR, interval: float = GRAPH_SNAPSHOT_INTERVAL):
+        self.directory = directory
+        self.interval = interval
+        # Par tenant : snapshot mappé et (inode, mtime) du pointeur CURRENT correspondant
+        self._current: Dict[str, MappedSnapshot] = {}
+        self._pointer_stat: Dict[str, Tuple[int, int]] = {}
+        # Par tenant : horloge monotone de la dernière écriture de ce processus
+        self._written_at: Dict[str, float] = {}
+        self._swap_lock = threading.Lock()
+        self._lock_fd: Optional[int] = None
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory)
+
+    @property
+    def is_writer(self) -> bool:
+        return self._lock_fd is not None
+
+    def start(self):
+        """Démarre le thread de rafraîchissement (idempotent, sans effet si désactivé)."""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="graph-snapshot", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread et libère le verrou d'écriture."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=self.interval + 5)
+            self._thread = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def mark_dirty(self, tenant: str = DEFAULT_TENANT):
+        """
+        Signale une écriture locale : l'écrivain revérifie la version sans attendre l'intervalle,
+        et ce processus lit le tenant dans Neo4j (current() retourne None) pendant deux
+        intervalles, le temps que le snapshot intègre l'écriture. Les autres workers, eux,
+        peuvent servir un snapshot en retard d'au plus GRAPH_SNAPSHOT_INTERVAL (plus le temps d'écriture).
+        """
+        self._written_at[tenant] = time.monotonic()
+        self._wake.set()
+
+    def _tenant_dir(self, tenant: str) -> str:
+        return os.path.join(self.directory, tenant)
+
+    def current(self, tenant: str = DEFAULT_TENANT) -> Optional[MappedSnapshot]:
+        """
+        Retourne le snapshot courant du tenant, en basculant sur le nouveau fichier si le pointeur
+        a changé. Un simple stat() par appel ; aucune lecture si rien n'a changé.
+        Un tenant existant sans snapshot est enregistré (sous-répertoire) pour que l'écrivain le
+        prenne en charge ; un tenant inexistant ne crée rien (lecture directe Neo4j, vide).
+        """
+        if not self.enabled:
+            return None
+        if time.monotonic() - self._written_at.get(tenant, float("-inf")) < 2 * self.interval:
+            # Lecture de ses propres écritures
+            return None
+        return self._mapped(tenant)
+
+    def _mapped(self, tenant: str) -> Optional[MappedSnapshot]:
+        directory = self._tenant_dir(tenant)
+        pointer = os.path.join(directory, POINTER_FILE)
+        try:
+            st = os.stat(pointer)
+        except FileNotFoundError:
+            if not os.path.isdir(directory) and tenant_exists(tenant):
+                os.makedirs(directory, exist_ok=True)
+                self._wake.set()
+            return None
+        key = (st.st_ino, st.st_mtime_ns)
+        if key != self._pointer_stat.get(tenant):
+            with self._swap_lock:
+                if key != self._pointer_stat.get(tenant):
+                    try:
+                        with open(pointer) as f:
+                            name = f.read().strip()
+                        self._current[tenant] = MappedSnapshot(os.path.join(directory, name))
+                        self._pointer_stat[tenant] = key
+                    except (OSError, ValueError) as e:
+                        # Fichier supprimé entre-temps : on garde l'ancien snapshot
+                        print(f"[Snapshot Error] {str(e)}")
+        return self._current.get(tenant)
+
+    def tenants(self) -> List[str]:
+        """Tenants enregistrés (un sous-répertoire chacun)."""
+        if not self.enabled or not os.path.isdir(self.directory):
+            return []
+        return sorted(entry.name for entry in os.scandir(self.directory) if entry.is_dir())
+
+    def refresh(self, tenant: str = DEFAULT_TENANT) -> bool:
+        """
+        Réécrit le snapshot du tenant si la version de son graph a changé (écrivain uniquement).
+
+        Returns:
+            True si un nouveau snapshot a été écrit
+        """
+        version = graph_version(tenant)
+        current = self._mapped(tenant)
+        if current is not None and current.version == version:
+            return False
+        nodes, edges = fetch_graph(tenant)
+        directory = self._tenant_dir(tenant)
+        os.makedirs(directory, exist_ok=True)
+        name = write_snapshot(directory, version, nodes, edges)
+        _prune_snapshots(directory, name)
+        return True
+
+    def _try_acquire_writer(self) -> bool:
+        if self._lock_fd is not None:
+            return True
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        print(f"[INFO] Worker {os.getpid()} écrit les snapshots du graph")
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Remis à zéro avant le rafraîchissement : un mark_dirty() pendant celui-ci n'est pas perdu
+            self._wake.clear()
+            # Les lecteurs retentent le verrou : si l'écrivain meurt, un autre prend le relais
+            if self._try_acquire_writer():
+                for tenant in set(self.tenants()) | {DEFAULT_TENANT}:
+                    try:
+                        self.refresh(tenant)
+                    except Exception as e:
+                        print(f"[Snapshot Error] {tenant}: {str(e)}")
+            self._wake.wait(self.interval)
+
+
+# Instance partagée, démarrée dans le lifespan de l'application
+snapshots = SnapshotManager()
@@ -0,0 +1,227 @@
+"""
+Tenancy Module - Partitionnement du graph par tenant (business unit / workspace)
+Chaque nœud porte la propriété `tenant` et le label `T_<tenant>` : un index par label de tenant
+borne les scans à une seule partition. Les gros tenants peuvent être placés dans une base
+Neo4j dédiée (TENANT_DATABASES), sélectionnée à l'ouverture de session.
+"""
+
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import hashlib
+import os
+import threading
+import time
+
+from .neo4j_client import run_query
+
+# Tenant utilisé quand la requête n'en précise pas
+DEFAULT_TENANT = os.getenv("DEFAULT_TENANT", "default")
+# Tenants hébergés dans une base dédiée : "tenant=base,tenant2=base2"
+TENANT_DATABASES: Dict[str, str] = dict(
+    item.split("=", 1) for item in os.getenv("TENANT_DATABASES", "").replace(" ", "").split(",") if "=" in item
+)
+# Nœuds supprimés par transaction lors d'un reset de tenant
+TENANT_DELETE_BATCH = int(os.getenv("TENANT_DELETE_BATCH", "10000"))
+# Délai minimal entre deux relectures des tenants connus sur un tenant inconnu (secondes)
+TENANT_CACHE_TTL = float(os.getenv("TENANT_CACHE_TTL", "5"))
+
+# Préfixe réservé aux labels de tenant : interdit aux types de nœud et de relation
+TENANT_LABEL_PREFIX = "T_"
+
+
+def safe_tenant(tenant: Optional[str]) -> str:
+    """Valide un identifiant de tenant (injecté dans les labels Cypher)."""
+    tenant = tenant or DEFAULT_TENANT
+    if len(tenant) > 64 or not all(c.isalnum() or c in "-_" for c in tenant):
+        raise ValueError("Tenant invalide (alphanumériques, tirets, underscores, 64 max)")
+    return tenant
+
+
+def safe_type(type_name: str) -> str:
+    """Valide un label de nœud ou un type de relation (injecté dans les requêtes Cypher)."""
+    if not type_name or len(type_name) > 64 or not all(c.isalnum() or c == "_" for c in type_name):
+        raise ValueError(f"Type invalide : {type_name!r}")
+    if type_name.startswith(TENANT_LABEL_PREFIX):
+        raise ValueError(f"Type invalide : {type_name!r} (préfixe {TENANT_LABEL_PREFIX} réservé aux tenants)")
+    return type_name
+
+
+def tenant_label(tenant: str) -> str:
+    """Label Cypher (échappé) de la partition d'un tenant."""
+    return f"`{TENANT_LABEL_PREFIX}{tenant}`"
+
+
+def node_type(var: str = "n") -> str:
+    """Expression Cypher du type d'un nœud : son label, hors label de tenant."""
+    return f"[label IN labels({var}) WHERE NOT label STARTS WITH '{TENANT_LABEL_PREFIX}'][0]"
+
+
+def tenant_database(tenant: str) -> Optional[str]:
+    """Base Neo4j du tenant, ou None pour la base par défaut."""
+    return TENANT_DATABASES.get(tenant)
+
+
+def known_tenants() -> List[str]:
+    """Tenants présents : labels T_* de la base par défaut, plus ceux des bases dédiées."""
+    rows = run_query("CALL db.labels() YIELD label RETURN label", write=False)
+    tenants = set(TENANT_DATABASES)
+    prefix = TENANT_LABEL_PREFIX
+    tenants.update(row["label"][len(prefix):] for row in rows if row["label"].startswith(prefix))
+    return sorted(tenants)
+
+
+_known: Set[str] = set()
+_known_checked_at = 0.0
+_known_lock = threading.Lock()
+
+
+def register_tenant(tenant: str):
+    """Enregistre un tenant écrit par ce processus (voir tenant_exists)."""
+    _known.add(tenant)
+
+
+def tenant_exists(tenant: str) -> bool:
+    """
+    True si le tenant a des données : tenant par défaut, base dédiée, tenant écrit par ce
+    processus, ou label présent dans Neo4j. Sur un tenant inconnu, les labels sont relus au
+    plus une fois par TENANT_CACHE_TTL : une lecture sur un tenant arbitraire reste bon marché.
+    """
+    global _known_checked_at
+    if tenant == DEFAULT_TENANT or tenant in TENANT_DATABASES or tenant in _known:
+        return True
+    with _known_lock:
+        if tenant in _known:
+            return True
+        if time.monotonic() - _known_checked_at < TENANT_CACHE_TTL:
+            return False
+        _known_checked_at = time.monotonic()
+        _known.update(known_tenants())
+        return tenant in _known
+
+
+# ===== Schéma par tenant =====
+
+_schema_ready: Set[str] = set()
+_schema_lock = threading.Lock()
+
+# Index créés pour chaque label de tenant ({label} et {name} sont remplacés ; {name} dérive
+# d'un hash du tenant, "a-b" et "a_b" n'ont donc pas les mêmes index)
+TENANT_INDEXES = [
+    "CREATE INDEX {name}_id IF NOT EXISTS FOR (n:{label}) ON (n.id)",
+    "CREATE RANGE INDEX {name}_created_at IF NOT EXISTS FOR (n:{label}) ON (n.created_at)",
+    "CREATE RANGE INDEX {name}_agent_created_at IF NOT EXISTS FOR (n:{label}) ON (n.agent, n.created_at)",
+]
+
+# Index créés pour chaque type de nœud / de relation ({type} est remplacé) : le tenant est
+# une propriété en tête de l'index composite (les arêtes n'ont pas de label de tenant)
+TYPE_INDEXES = {
+    "node": "CREATE RANGE INDEX node_{type}_created_at IF NOT EXISTS FOR (n:{type}) ON (n.tenant, n.created_at)",
+    "edge": "CREATE RANGE INDEX edge_{type}_created_at IF NOT EXISTS FOR ()-[r:{type}]-() ON (r.tenant, r.created_at)",
+}
+_type_schema_ready: Set[Tuple[Optional[str], str, str]] = set()
+
+
+def ensure_tenant_schema(tenant: str):
+    """Crée (une fois par processus) les index du tenant avant sa première écriture."""
+    if tenant in _schema_ready:
+        return
+    with _schema_lock:
+        if tenant in _schema_ready:
+            return
+        name = "tenant_" + hashlib.sha1(tenant.encode("utf-8")).hexdigest()[:16]
+        for statement in TENANT_INDEXES:
+            run_query(statement.format(name=name, label=tenant_label(tenant)), database=tenant_database(tenant))
+        _schema_ready.add(tenant)
+        register_tenant(tenant)
+
+
+def ensure_type_schema(kind: str, type_name: str, tenant: str):
+    """
+    Crée (une fois par processus et par base) l'index created_at d'un type de nœud
+    (kind="node") ou de relation (kind="edge"), avant sa première écriture.
+    """
+    safe_type(type_name)
+    database = tenant_database(tenant)
+    key = (database, kind, type_name)
+    if key in _type_schema_ready:
+        return
+    with _schema_lock:
+        if key in _type_schema_ready:
+            return
+        run_query(TYPE_INDEXES[kind].format(type=type_name), database=database)
+        _type_schema_ready.add(key)
+
+
+def delete_tenant(tenant: str, batch_size: int = TENANT_DELETE_BATCH) -> int:
+    """
+    Supprime tous les nœuds d'un tenant par lots (une transaction par lot),
+    pour ne jamais construire une transaction géante ni bloquer les autres tenants.
+
+    Returns:
+        Nombre de nœuds supprimés
+    """
+    query = """
+    MATCH (n:{label})
+    WITH n LIMIT $batch
+    DETACH DELETE n
+    RETURN count(*) AS deleted
+    """.format(label=tenant_label(tenant))
+    total = 0
+    while True:
+        result = run_query(query, {"batch": batch_size}, database=tenant_database(tenant))
+        deleted = result[0]["deleted"] if result else 0
+        total += deleted
+        if deleted < batch_size:
+            return total
+
+
+# ===== Index en mémoire par tenant =====
+
+class TenantRegistry:
+    """
+    Une instance d'index (adjacence, vecteurs...) par tenant. get() la crée (chemin
+    d'écriture) ; find() ne la crée que pour un tenant existant (chemin de lecture : un
+    ?tenant= arbitraire ne doit créer ni fichier ni thread).
+    Après start(), chaque nouvelle instance est démarrée dès sa création.
+    """
+
+    def __init__(self, factory: Callable[[str], object]):
+        self._factory = factory
+        self._items: Dict[str, object] = {}
+        self._lock = threading.Lock()
+        self._started = False
+
+    def get(self, tenant: str = DEFAULT_TENANT):
+        item = self._items.get(tenant)
+        if item is None:
+            with self._lock:
+                item = self._items.get(tenant)
+                if item is None:
+                    item = self._factory(tenant)
+                    self._items[tenant] = item
+                    if self._started:
+                        item.start()
+        return item
+
+    def find(self, tenant: str = DEFAULT_TENANT):
+        """Instance du tenant, ou None si le tenant n'existe pas (voir tenant_exists)."""
+        item = self._items.get(tenant)
+        if item is None and tenant_exists(tenant):
+            item = self.get(tenant)
+        return item
+
+    def items(self) -> Dict[str, object]:
+        return dict(self._items)
+
+    def start(self):
+        """Démarre les instances existantes et celle du tenant par défaut."""
+        self._started = True
+        self.get(DEFAULT_TENANT)
+        for item in self.items().values():
+            item.start()
+
+    def stop(self):
+        self._started = False
+        for item in self.items().values():
+            stop = getattr(item, "stop", None)
+            if stop is not None:
+                stop()
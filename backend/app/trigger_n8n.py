@@ -45,6 +45,166 @@ def test_health_check():
     assert data["status"] == "ok"
 
 
+def test_health_check_deep():
+    """Teste le mode deep du health check (requête directe à Neo4j)."""
+    response = client.get("/api/health", params={"deep": True})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["data"]["neo4j"]["ok"] is True
+    assert "latency_ms" in data["data"]["neo4j"]
+
+
+def test_metrics():
+    """Teste l'exposition des compteurs d'exécution Neo4j."""
+    client.get("/api/health", params={"deep": True})
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["data"]["counters"]["neo4j.transactions"] > 0
+
+
+def test_warm_up_holds_connections(monkeypatch):
+    """Teste que le warm-up tient N connexions ouvertes en même temps avant de les relâcher."""
+    from app import neo4j_client
+    held = {"now": 0, "max": 0}
+
+    class FakeTransaction:
+        def __init__(self):
+            held["now"] += 1
+            held["max"] = max(held["max"], held["now"])
+
+        def run(self, query):
+            return self
+
+        def consume(self):
+            pass
+
+        def rollback(self):
+            held["now"] -= 1
+
+    class FakeSession:
+        def begin_transaction(self):
+            return FakeTransaction()
+
+        def close(self):
+            pass
+
+    class FakeDriver:
+        def session(self):
+            return FakeSession()
+
+    monkeypatch.setattr(neo4j_client, "get_driver", lambda: FakeDriver())
+    assert neo4j_client.warm_up(3) == 3
+    assert held == {"now": 0, "max": 3}
+
+
+# ===== TESTS DE RÉSILIENCE NEO4J =====
+
+def test_circuit_breaker_states():
+    """Teste les transitions closed -> open -> half_open -> closed du disjoncteur."""
+    from app.neo4j_client import CircuitBreaker
+    breaker = CircuitBreaker(threshold=2, reset_timeout=0)
+    breaker.record_failure()
+    assert breaker.state == "closed"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    # reset_timeout écoulé : une seule requête d'essai passe
+    assert breaker.allow() is True
+    assert breaker.state == "half_open"
+    assert breaker.allow() is False
+    breaker.record_success()
+    assert breaker.state == "closed"
+    assert breaker.allow() is True
+
+    breaker = CircuitBreaker(threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    assert breaker.allow() is False
+
+
+def fake_neo4j_sessions(monkeypatch, errors):
+    """
+    Remplace le driver : chaque transaction lève la prochaine erreur de l'itérateur `errors`,
+    puis réussit avec "ok" une fois celui-ci épuisé. Retourne le compteur de tentatives.
+    """
+    from app import neo4j_client
+    attempts = {"count": 0}
+
+    class FakeSession:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *args):
+            pass
+
+        def execute_write(self, work):
+            attempts["count"] += 1
+            error = next(errors, None)
+            if error is not None:
+                raise error
+            return "ok"
+
+    class FakeDriver:
+        def session(self, database=None):
+            return FakeSession()
+
+    monkeypatch.setattr(neo4j_client, "get_driver", lambda: FakeDriver())
+    monkeypatch.setattr(neo4j_client, "breaker", neo4j_client.CircuitBreaker(100, 10))
+    monkeypatch.setattr(neo4j_client, "NEO4J_RETRY_BASE_DELAY", 0.01)
+    return attempts
+
+
+def test_execute_retries_transient_errors(monkeypatch):
+    """Teste le rejeu des erreurs transitoires et de celles que le driver déclare rejouables."""
+    from neo4j.exceptions import Neo4jError, TransientError
+    from app import neo4j_client
+
+    class LeaderSwitched(Neo4jError):
+        def is_retryable(self):
+            return True
+
+    attempts = fake_neo4j_sessions(monkeypatch, iter([TransientError("Deadlock"), LeaderSwitched("NotALeader")]))
+    assert neo4j_client.run_transaction(lambda tx: None) == "ok"
+    assert attempts["count"] == 3
+
+
+def test_execute_gives_up_at_deadline(monkeypatch):
+    """Teste l'abandon des retries avant la deadline de la requête."""
+    import itertools
+    import time
+    from neo4j.exceptions import TransientError
+    from app import neo4j_client
+    attempts = fake_neo4j_sessions(monkeypatch, itertools.repeat(TransientError("Deadlock")))
+    monkeypatch.setattr(neo4j_client, "NEO4J_MAX_RETRIES", 100)
+
+    token = neo4j_client.set_deadline(0.3)
+    started = time.monotonic()
+    try:
+        with pytest.raises(neo4j_client.DatabaseUnavailableError):
+            neo4j_client.run_transaction(lambda tx: None)
+    finally:
+        neo4j_client.reset_deadline(token)
+    assert time.monotonic() - started < 0.3
+    assert 1 < attempts["count"] < 100
+
+
+def test_request_timeout_must_be_positive():
+    """Teste le refus d'un X-Request-Timeout nul, qui lèverait la deadline."""
+    response = client.get("/api/health", headers={"X-Request-Timeout": "0"})
+    assert response.status_code == 400
+
+
+def test_server_error_mapping():
+    """Teste la traduction des erreurs Neo4j en 503 (avec Retry-After) et 504."""
+    from app.neo4j_client import DatabaseUnavailableError, QueryTimeoutError, NEO4J_CIRCUIT_RESET
+    from app.routes import server_error
+    unavailable = server_error(DatabaseUnavailableError("Neo4j indisponible (circuit ouvert)"))
+    assert unavailable.status_code == 503
+    assert unavailable.headers["Retry-After"] == str(int(NEO4J_CIRCUIT_RESET))
+    assert server_error(QueryTimeoutError("Deadline de la requête dépassée")).status_code == 504
+    assert server_error(RuntimeError("bug")).status_code == 500
+
+
 # ===== TESTS CRUD =====
 
 def test_add_node_success():
@@ -100,6 +260,117 @@ def test_get_graph():
     assert "edges" in data
 
 
+def test_get_neighbors():
+    """Teste la récupération du voisinage d'un nœud."""
+    client.post("/api/seed")
+    response = client.get("/api/node/task-1/neighbors")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["data"]["node"]["id"] == "task-1"
+    assert any(edge["target"] == "issue-1" for edge in data["data"]["edges"])
+
+
+def test_snapshot_round_trip(tmp_path):
+    """Teste l'écriture d'un snapshot, sa lecture mappée, la bascule du pointeur et mark_dirty."""
+    from app.snapshot import SnapshotManager, write_snapshot
+    from app.tenancy import DEFAULT_TENANT
+    directory = tmp_path / DEFAULT_TENANT
+    directory.mkdir()
+    nodes = [
+        {"id": "task-1", "type": "Task", "content": "Préparer le plan Q2", "agent": "seed"},
+        {"id": "issue-1", "type": "Issue", "content": "Rapport Q1 manquant", "agent": "seed"},
+        {"id": "topic-1", "type": "Topic", "content": "Q2 Planning", "agent": "seed"},
+    ]
+    edges = [
+        {"source": "task-1", "target": "issue-1", "type": "depends_on"},
+        {"source": "task-1", "target": "topic-1", "type": "about"},
+    ]
+    write_snapshot(str(directory), "3-2-1700000000000", nodes, edges)
+
+    manager = SnapshotManager(str(tmp_path), interval=60)
+    snapshot = manager.current(DEFAULT_TENANT)
+    assert snapshot.version == "3-2-1700000000000"
+    graph = json.loads(bytes(snapshot.graph_json()))
+    assert (graph["nodes"], graph["edges"]) == (nodes, edges)
+    assert snapshot.neighborhood("task-1") == {"node": nodes[0], "edges": edges}
+    assert snapshot.neighborhood("topic-1") == {"node": nodes[2], "edges": [edges[1]]}
+    assert snapshot.neighborhood("absent") is None
+
+    # Nouvelle version : les lecteurs basculent sur le fichier pointé par CURRENT
+    nodes.append({"id": "issue-2", "type": "Issue", "content": "Performance de la DB", "agent": "seed"})
+    write_snapshot(str(directory), "4-2-1700000000001", nodes, edges)
+    assert manager.current(DEFAULT_TENANT).version == "4-2-1700000000001"
+    assert manager.current(DEFAULT_TENANT).neighborhood("issue-2") == {"node": nodes[3], "edges": []}
+
+    # Écriture locale : lecture directe Neo4j le temps que le snapshot l'intègre
+    manager.mark_dirty(DEFAULT_TENANT)
+    assert manager.current(DEFAULT_TENANT) is None
+
+
+def test_find_path():
+    """Teste la recherche de plus court chemin entre une Decision et une Issue."""
+    client.post("/api/seed")
+    response = client.get("/api/path", params={
+        "source": "decision-1",
+        "target": "issue-1",
+        "direction": "out"
+    })
+    assert response.status_code == 200
+    data = response.json()
+    assert data["length"] == 2
+    assert [node["id"] for node in data["paths"][0]["nodes"]] == ["decision-1", "task-1", "issue-1"]
+
+
+def test_find_path_invalid_direction():
+    """Teste le rejet d'une direction invalide."""
+    response = client.get("/api/path", params={"source": "a", "target": "b", "direction": "up"})
+    assert response.status_code == 400
+
+
+def test_find_path_from_index(monkeypatch):
+    """Teste le BFS bidirectionnel de l'index d'adjacence chargé, et le chemin d'un nœud à lui-même."""
+    from app import routes
+    from app.graph_index import AdjacencyIndex
+    from app.tenancy import DEFAULT_TENANT, TenantRegistry
+    # Registre neuf : l'index reste froid jusqu'au load() explicite
+    registry = TenantRegistry(AdjacencyIndex)
+    monkeypatch.setattr(routes, "adjacency", registry)
+    client.post("/api/seed")
+
+    same_params = {"source": "task-1", "target": "task-1"}
+    from_cypher = client.get("/api/path", params=same_params).json()
+    assert (from_cypher["served_from"], from_cypher["length"]) == ("cypher", 0)
+
+    registry.get(DEFAULT_TENANT).load()
+    from_index = client.get("/api/path", params=same_params).json()
+    assert (from_index["served_from"], from_index["length"]) == ("index", 0)
+    assert from_index["paths"] == from_cypher["paths"] == [{"nodes": [{"id": "task-1", "type": "Task"}], "edges": []}]
+
+    data = client.get("/api/path", params={"source": "issue-1", "target": "decision-1", "direction": "in"}).json()
+    assert (data["served_from"], data["length"]) == ("index", 2)
+    assert [node["id"] for node in data["paths"][0]["nodes"]] == ["issue-1", "task-1", "decision-1"]
+    assert data["paths"][0]["edges"] == [
+        {"source": "task-1", "type": "depends_on", "target": "issue-1"},
+        {"source": "decision-1", "type": "based_on", "target": "task-1"},
+    ]
+
+    # Filtre de types : seul topic-1 relie task-1 et task-2 par des arêtes about ; aucun chemin sortant
+    data = client.get("/api/path", params={"source": "task-1", "target": "task-2", "types": "about"}).json()
+    assert [[node["id"] for node in path["nodes"]] for path in data["paths"]] == [["task-1", "topic-1", "task-2"]]
+    assert client.get("/api/path", params={"source": "task-1", "target": "task-2", "direction": "out"}).json()["paths"] == []
+
+
+def test_related_nodes():
+    """Teste la recherche de nœuds similaires par contenu."""
+    client.post("/api/seed")
+    response = client.get("/api/related/task-1", params={"k": 3})
+    assert response.status_code == 200
+    data = response.json()
+    related_ids = [item["id"] for item in data["data"]["related"]]
+    assert related_ids[0] == "decision-1"
+    assert "topic-1" in related_ids
+
+
 def test_seed_graph():
     """Teste l'insertion des données de seed."""
     response = client.post("/api/seed")
@@ -128,5 +399,206 @@ def test_ingest_text():
     assert data["status"] == "created"
 
 
+def test_ingest_text_extracts_person():
+    """Teste l'extraction d'une Person et de l'arête assigned_to."""
+    payload = {
+        "text": "Préparer plan Q3. Assigner à Alice. Écrire à bob@example.com"
+    }
+    response = client.post("/api/ingest_text", json=payload)
+    data = response.json()
+    created = {node["id"]: node for node in data["data"]["created_nodes"]}
+    assert created["person-alice"]["type"] == "Person"
+    assert not [node_id for node_id in created if node_id.startswith("person-bob")]
+    
+    neighbors = client.get("/api/node/person-alice/neighbors").json()
+    assert [edge["type"] for edge in neighbors["data"]["edges"]] == ["assigned_to"]
+
+
+def test_ingest_stream():
+    """Teste l'ingestion en flux d'un document brut."""
+    body = "Revue du sprint avec @bob. Problème de performance sur #db.\n" * 200
+    response = client.post(
+        "/api/ingest_stream",
+        content=body.encode("utf-8"),
+        headers={"Content-Type": "text/plain"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["data"]["stats"]["tasks"] == 400
+
+
+def test_write_buffered_when_circuit_open(monkeypatch, tmp_path):
+    """Teste qu'une écriture est mise en file (202, pending) quand le circuit est ouvert."""
+    from app import neo4j_client, routes, write_buffer
+    buffer = write_buffer.WriteBuffer(str(tmp_path))
+    monkeypatch.setattr(routes, "write_buffer", buffer)
+    monkeypatch.setattr(neo4j_client.breaker, "state", "open")
+
+    node = {"id": "wal-1", "type": "Task", "content": "En file", "agent": "test"}
+    response = client.post("/api/add_node", json=node)
+    assert response.status_code == 202
+    data = response.json()
+    assert data["status"] == "pending"
+    assert data["data"] == {"seq": 1, "pending": 1}
+    buffer.stop()
+
+
+def fake_wal_transactions(monkeypatch, rejected_ids=()):
+    """
+    Remplace Neo4j pour le rejeu du journal : retourne la liste des (op, id) validés,
+    dans l'ordre. Une transaction qui touche un id de `rejected_ids` est refusée en bloc.
+    """
+    from app import write_buffer
+    applied = []
+
+    class FakeTransaction:
+        def __init__(self):
+            self.ops = []
+
+        def run(self, query, parameters):
+            op = "add_edge" if "source" in parameters else "add_node"
+            node_id = parameters["source"] if op == "add_edge" else parameters["id"]
+            if node_id in rejected_ids:
+                raise RuntimeError(f"Nœud {node_id} refusé")
+            self.ops.append((op, node_id))
+
+    def run_transaction(work, database=None):
+        tx = FakeTransaction()
+        work(tx)
+        applied.extend(tx.ops)
+
+    monkeypatch.setattr(write_buffer, "run_transaction", run_transaction)
+    monkeypatch.setattr(write_buffer, "ensure_tenant_schema", lambda tenant: None)
+    monkeypatch.setattr(write_buffer, "ensure_type_schema", lambda kind, type_name, tenant: None)
+    return applied
+
+
+def test_write_buffer_replay(monkeypatch, tmp_path):
+    """Teste le rejeu dans l'ordre d'append, l'avancée du pointeur de commit et la compaction."""
+    from app import write_buffer
+    applied = fake_wal_transactions(monkeypatch)
+    buffer = write_buffer.WriteBuffer(str(tmp_path))
+    buffer.append("add_node", {"id": "wal-a", "type": "Task", "content": "A", "agent": "test"})
+    buffer.append("add_node", {"id": "wal-b", "type": "Task", "content": "B", "agent": "test"})
+    buffer.append("add_edge", {"source": "wal-a", "target": "wal-b", "type": "depends_on"})
+    assert buffer.pending == 3
+
+    assert buffer.replay() == 3
+    assert applied == [("add_node", "wal-a"), ("add_node", "wal-b"), ("add_edge", "wal-a")]
+    assert buffer.pending == 0
+    assert (tmp_path / "committed").read_text() == "3"
+    # Compaction : plus rien à rejouer dans le journal
+    assert (tmp_path / "wal.log").read_bytes() == b""
+
+    assert buffer.append("add_node", {"id": "wal-c", "type": "Task", "content": "C", "agent": "test"}) == 4
+    buffer.stop()
+
+
+def test_write_buffer_dead_letter(monkeypatch, tmp_path):
+    """Teste qu'une entrée refusée par Neo4j part en dead letter sans bloquer les suivantes."""
+    from app import write_buffer
+    applied = fake_wal_transactions(monkeypatch, rejected_ids={"wal-bad"})
+    buffer = write_buffer.WriteBuffer(str(tmp_path))
+    buffer.append("add_node", {"id": "wal-a", "type": "Task", "content": "A", "agent": "test"})
+    buffer.append("add_node", {"id": "wal-bad", "type": "Task", "content": "Refusé", "agent": "test"})
+    buffer.append("add_node", {"id": "wal-c", "type": "Task", "content": "C", "agent": "test"})
+
+    assert buffer.replay() == 2
+    assert applied == [("add_node", "wal-a"), ("add_node", "wal-c")]
+    assert buffer.pending == 0
+    assert (tmp_path / "committed").read_text() == "3"
+
+    dead = [json.loads(line) for line in (tmp_path / "dead_letter.log").read_text().splitlines()]
+    assert [(entry["seq"], entry["payload"]["id"]) for entry in dead] == [(2, "wal-bad")]
+    assert "refusé" in dead[0]["error"]
+    buffer.stop()
+
+
+def test_activity_feed():
+    """Teste le fil d'activité paginé par curseur et filtré par type."""
+    client.post("/api/seed")
+    first = client.get("/api/activity", params={"limit": 10}).json()
+    assert len(first["events"]) == 10
+    assert first["next_cursor"]
+    
+    second = client.get("/api/activity", params={"limit": 10, "cursor": first["next_cursor"]}).json()
+    assert len(second["events"]) == 5
+    assert second["next_cursor"] is None
+    
+    edges = client.get("/api/activity", params={"type": "about"}).json()
+    assert {(e["source"], e["target"]) for e in edges["events"]} == {("task-1", "topic-1"), ("task-2", "topic-1")}
+
+
+def test_tenant_isolation():
+    """Teste qu'un tenant ne voit ni ne supprime les nœuds d'un autre tenant."""
+    client.post("/api/seed")
+    node = {"id": "acme-task", "type": "Task", "content": "Budget acme", "tenant": "acme"}
+    assert client.post("/api/add_node", json=node).status_code == 200
+    
+    assert client.get("/api/node/acme-task", params={"tenant": "acme"}).status_code == 200
+    assert client.get("/api/node/acme-task").status_code == 404
+    
+    response = client.post("/api/reset", params={"tenant": "acme"})
+    assert response.json()["data"]["deleted"] == 1
+    assert client.get("/api/node/task-1").status_code == 200
+    
+    response = client.get("/api/graph", params={"tenant": "bad tenant"})
+    assert response.status_code == 400
+
+
+def test_admin_profile(monkeypatch, tmp_path):
+    """Teste le profil du processus entier, réservé au jeton d'administration."""
+    from app import profiling
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(profiling, "PROFILE_DIR", str(tmp_path))
+    
+    assert client.post("/api/admin/profile", params={"seconds": 0.2}).status_code == 403
+    
+    headers = {"X-Admin-Token": "secret"}
+    response = client.post("/api/admin/profile", params={"seconds": 0.2}, headers=headers)
+    assert response.status_code == 200
+    name = response.json()["data"]["name"]
+    
+    profiles = client.get("/api/admin/profiles", headers=headers).json()
+    assert name in profiles["data"]["profiles"]
+
+
+def test_retention_sweep(monkeypatch):
+    """Teste qu'une politique supprime les placeholders IA sauf ceux reliés par une arête humaine."""
+    from app import profiling, retention
+    monkeypatch.setattr(profiling, "ADMIN_TOKEN", "secret")
+    monkeypatch.setattr(retention.sweeper, "policies", retention.parse_policies([
+        {"name": "ai-placeholders", "agent": "AI", "type": "Person", "older_than_days": 0}
+    ]))
+    client.post("/api/seed")
+    client.post("/api/add_node", json={"id": "ai-old", "type": "Person", "content": "Assistant auto", "agent": "AI"})
+    client.post("/api/add_node", json={"id": "ai-kept", "type": "Person", "content": "Assistant auto", "agent": "AI"})
+    client.post("/api/add_edge", json={"source": "ai-kept", "target": "task-1", "type": "assigned_to"})
+    
+    headers = {"X-Admin-Token": "secret"}
+    response = client.post("/api/admin/retention/sweep", params={"dry_run": "false"}, headers=headers)
+    assert response.json()["data"]["results"]["ai-placeholders"] >= 1
+    assert client.get("/api/node/ai-old").status_code == 404
+    assert client.get("/api/node/ai-kept").status_code == 200
+
+
+def test_dependency_dag():
+    """Teste l'impact, le chemin critique et la détection de cycle sur les arêtes depends_on."""
+    client.post("/api/seed")
+    client.post("/api/add_edge", json={"source": "task-2", "target": "task-1", "type": "depends_on"})
+    
+    impact = client.get("/api/dag/impact/issue-1").json()["data"]
+    assert impact["nodes"] == [{"id": "task-1", "depth": 1}, {"id": "task-2", "depth": 2}]
+    assert client.get("/api/dag/impact/person-1").status_code == 404
+    
+    critical = client.get("/api/dag/critical_path").json()["data"]
+    assert critical["path"] == [["issue-1"], ["task-1"], ["task-2"]]
+    assert client.get("/api/dag/cycles").json()["data"]["acyclic"] is True
+    
+    client.post("/api/add_edge", json={"source": "task-1", "target": "task-2", "type": "depends_on"})
+    cycles = client.get("/api/dag/cycles").json()["data"]["cycles"]
+    assert [c["nodes"] for c in cycles] == [["task-1", "task-2"]]
+
+
 if __name__ == "__main__":
     pytest.main([__file__, "-v"])
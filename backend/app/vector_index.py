@@ -0,0 +1,336 @@
+"""
+Vector Index Module - Recherche de nœuds similaires en mémoire
+Chaque nœud est représenté par un vecteur de n-grammes de caractères hachés (calcul local,
+aucun modèle distant), normalisé L2. La similarité cosinus est un produit matriciel NumPy
+par blocs sur une matrice persistée dans un fichier mappé (np.memmap).
+
+Fichiers (dans VECTOR_INDEX_DIR) :
+    vectors.f32 : matrice (capacité, VECTOR_DIM) float32, agrandie par doublement
+    ids.log     : journal append-only "ligne<TAB>id<TAB>type", ligne sans id = suppression
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+import fcntl
+import os
+import re
+import threading
+import unicodedata
+import zlib
+
+import numpy as np
+
+from .neo4j_client import run_query
+from .tenancy import DEFAULT_TENANT, TenantRegistry, node_type, tenant_database, tenant_label
+
+# Répertoire de persistance, un sous-répertoire par tenant (vide = index en mémoire,
+# reconstruit à chaque démarrage)
+VECTOR_INDEX_DIR = os.getenv("VECTOR_INDEX_DIR", "")
+# Dimension des vecteurs hachés
+VECTOR_DIM = int(os.getenv("VECTOR_DIM", "256"))
+# Lignes traitées par produit matriciel (borne la mémoire temporaire d'une requête)
+VECTOR_BLOCK_ROWS = int(os.getenv("VECTOR_BLOCK_ROWS", "65536"))
+
+NGRAM = 3
+INITIAL_CAPACITY = 1024
+_WORD = re.compile(r"\w+")
+
+
+def _normalize(text: str) -> str:
+    text = unicodedata.normalize("NFKD", text or "").encode("ascii", "ignore").decode("ascii")
+    return " ".join(text.lower().split())
+
+
+def embed(text: str, dim: int = VECTOR_DIM) -> np.ndarray:
+    """
+    Calcule le vecteur d'un texte : trigrammes de caractères + mots entiers,
+    hachés (crc32, stable entre processus) avec signe, TF sous-linéaire, norme L2.
+    """
+    normalized = _normalize(text)
+    padded = f" {normalized} "
+    grams = [padded[i:i + NGRAM] for i in range(len(padded) - NGRAM + 1)]
+    grams += ["w:" + word for word in _WORD.findall(normalized)]
+    vector = np.zeros(dim, dtype=np.float32)
+    if not grams:
+        return vector
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint32, count=len(grams))
+    signs = np.where(hashes >> 31, -1.0, 1.0).astype(np.float32)
+    np.add.at(vector, hashes % dim, signs)
+    vector = np.sign(vector) * np.log1p(np.abs(vector))
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+class VectorIndex:
+    """
+    Index vectoriel incrémental : une ligne par nœud, réécrite en place lors d'une mise à jour.
+    Plusieurs processus peuvent partager le même répertoire : les écritures prennent un verrou
+    fichier et chaque processus rejoue la fin du journal avant de répondre.
+    """
+
+    def __init__(self, tenant: str = DEFAULT_TENANT, directory: str = VECTOR_INDEX_DIR, dim: int = VECTOR_DIM):
+        self.tenant = tenant
+        directory = os.path.join(directory, tenant) if directory else ""
+        self.directory = directory
+        self.dim = dim
+        self._rows: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._types: List[Optional[str]] = []
+        self._matrix = np.zeros((INITIAL_CAPACITY, dim), dtype=np.float32)
+        self._log_offset = 0
+        # Inode du journal lu : clear() remplace les fichiers, un autre inode impose une relecture
+        self._log_inode: Optional[int] = None
+        self._lock = threading.RLock()
+        self._thread: Optional[threading.Thread] = None
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+            self._open()
+
+    @property
+    def size(self) -> int:
+        return len(self._rows)
+
+    # ===== Persistance =====
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.directory, "vectors.f32")
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, "ids.log")
+
+    def _open(self):
+        """Mappe la matrice et rejoue le journal des IDs."""
+        if not os.path.exists(self._vectors_path):
+            with open(self._vectors_path, "wb") as f:
+                f.truncate(INITIAL_CAPACITY * self.dim * 4)
+        self._map()
+        open(self._log_path, "a").close()
+        self._sync()
+
+    def _map(self):
+        capacity = os.path.getsize(self._vectors_path) // (self.dim * 4)
+        self._matrix = np.memmap(self._vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _sync(self):
+        """Intègre les lignes ajoutées au journal par ce processus ou par un autre."""
+        if not self.directory:
+            return
+        st = os.stat(self._log_path)
+        if st.st_ino != self._log_inode:
+            # Premier passage, ou fichiers remplacés par clear() dans un autre processus : relecture complète
+            self._rows, self._ids, self._types = {}, [], []
+            self._log_offset = 0
+            self._log_inode = st.st_ino
+            self._map()
+        size = st.st_size
+        if size == self._log_offset:
+            return
+        with open(self._log_path, "rb") as f:
+            f.seek(self._log_offset)
+            data = f.read()
+        # Ignore une éventuelle dernière ligne incomplète (écriture en cours)
+        complete = data[:data.rfind(b"\n") + 1]
+        self._log_offset += len(complete)
+        for line in complete.decode("utf-8").splitlines():
+            row, node_id, ntype = (line.split("\t") + ["", ""])[:3]
+            self._set_row(int(row), node_id or None, ntype or None)
+        if len(self._ids) > self._matrix.shape[0]:
+            self._map()
+
+    def _set_row(self, row: int, node_id: Optional[str], node_type: Optional[str]):
+        while len(self._ids) <= row:
+            self._ids.append(None)
+            self._types.append(None)
+        previous = self._ids[row]
+        if previous is not None and self._rows.get(previous) == row:
+            del self._rows[previous]
+        self._ids[row] = node_id
+        self._types[row] = node_type
+        if node_id is not None:
+            self._rows[node_id] = row
+
+    def _ensure_capacity(self, rows: int):
+        capacity = self._matrix.shape[0]
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        if self.directory:
+            self._matrix.flush()
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(capacity * self.dim * 4)
+            self._map()
+        else:
+            grown = np.zeros((capacity, self.dim), dtype=np.float32)
+            grown[:self._matrix.shape[0]] = self._matrix
+            self._matrix = grown
+
+    # ===== Écritures =====
+
+    def add_many(self, nodes: Iterable[dict]):
+        """
+        Ajoute ou met à jour des nœuds {id, type, content} (une ligne par id).
+        Les vecteurs sont calculés hors verrou, puis écrits en un seul passage.
+        """
+        batch = [(node["id"], node.get("type"), embed(node.get("content") or "", self.dim)) for node in nodes]
+        if not batch:
+            return
+        with self._lock, self._file_lock():
+            self._sync()
+            lines = []
+            for node_id, ntype, vector in batch:
+                row = self._rows.get(node_id)
+                if row is None:
+                    row = len(self._ids)
+                    self._ensure_capacity(row + 1)
+                self._matrix[row] = vector
+                self._set_row(row, node_id, ntype)
+                lines.append(f"{row}\t{node_id}\t{ntype or ''}\n")
+            self._append_log(lines)
+
+    def add(self, node_id: str, node_type: Optional[str], content: str):
+        self.add_many([{"id": node_id, "type": node_type, "content": content}])
+
+    def remove(self, node_ids: Iterable[str]):
+        """Supprime des nœuds : la ligne est mise à zéro et n'apparaît plus dans les résultats."""
+        with self._lock, self._file_lock():
+            self._sync()
+            lines = []
+            for node_id in node_ids:
+                row = self._rows.get(node_id)
+                if row is None:
+                    continue
+                self._matrix[row] = 0
+                self._set_row(row, None, None)
+                lines.append(f"{row}\t\t\n")
+            self._append_log(lines)
+
+    def clear(self):
+        """
+        Vide l'index. Les fichiers sont remplacés (os.replace), jamais tronqués : les processus
+        qui mappent encore l'ancienne matrice la lisent sans risque (SIGBUS) jusqu'à leur _sync().
+        """
+        with self._lock, self._file_lock():
+            self._rows, self._ids, self._types = {}, [], []
+            if self.directory:
+                for path, size in ((self._vectors_path, INITIAL_CAPACITY * self.dim * 4), (self._log_path, 0)):
+                    tmp_path = f"{path}.tmp.{os.getpid()}"
+                    with open(tmp_path, "wb") as f:
+                        f.truncate(size)
+                    os.replace(tmp_path, path)
+                self._log_offset = 0
+                self._log_inode = os.stat(self._log_path).st_ino
+                self._map()
+            else:
+                self._matrix = np.zeros((INITIAL_CAPACITY, self.dim), dtype=np.float32)
+
+    def _append_log(self, lines: List[str]):
+        if not self.directory or not lines:
+            return
+        self._matrix.flush()
+        data = "".join(lines).encode("utf-8")
+        with open(self._log_path, "ab") as f:
+            f.write(data)
+        self._log_offset += len(data)
+
+    def _file_lock(self):
+        return _FileLock(os.path.join(self.directory, "write.lock") if self.directory else None)
+
+    # ===== Requêtes =====
+
+    def related(self, node_id: str, k: int = 10) -> Optional[List[dict]]:
+        """
+        Retourne les k nœuds les plus proches (cosinus) du nœud donné, ou None s'il n'est pas indexé.
+        Produit matriciel par blocs + argpartition : O(N·dim) sans tri complet.
+        Le parcours se fait hors verrou, sur la matrice et le nombre de lignes relevés au départ :
+        les écritures et les autres requêtes ne l'attendent pas.
+        """
+        with self._lock:
+            self._sync()
+            row = self._rows.get(node_id)
+            if row is None:
+                return None
+            matrix = self._matrix
+            query = np.array(matrix[row])
+            count = len(self._ids)
+
+        candidates: List[Tuple[np.ndarray, np.ndarray]] = []
+        for start in range(0, count, VECTOR_BLOCK_ROWS):
+            block = matrix[start:min(start + VECTOR_BLOCK_ROWS, count)]
+            scores = block @ query
+            if start <= row < start + len(block):
+                scores[row - start] = -np.inf
+            top = min(k, len(scores))
+            best = np.argpartition(-scores, top - 1)[:top]
+            candidates.append((best + start, scores[best]))
+
+        rows = np.concatenate([c[0] for c in candidates])
+        scores = np.concatenate([c[1] for c in candidates])
+        order = np.argsort(-scores)
+        results = []
+        with self._lock:
+            for i in order:
+                candidate = int(rows[i])
+                # Ligne supprimée (ou index vidé) pendant le parcours : ignorée
+                if candidate >= len(self._ids) or self._ids[candidate] is None:
+                    continue
+                if not np.isfinite(scores[i]) or scores[i] <= 0:
+                    continue
+                results.append({
+                    "id": self._ids[candidate],
+                    "type": self._types[candidate],
+                    "score": round(float(scores[i]), 4),
+                })
+                if len(results) >= k:
+                    break
+        return results
+
+    # ===== Amorçage =====
+
+    def start(self):
+        """Si l'index est vide (premier démarrage ou mode mémoire), l'alimente depuis Neo4j en arrière-plan."""
+        if self.size or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._thread = threading.Thread(target=self._backfill, name=f"vector-index-{self.tenant}", daemon=True)
+        self._thread.start()
+
+    def _backfill(self, batch_size: int = 5000):
+        try:
+            nodes = run_query(
+                "MATCH (n:{label}) RETURN n.id AS id, {type} AS type, n.content AS content".format(
+                    label=tenant_label(self.tenant), type=node_type()
+                ),
+                write=False,
+                database=tenant_database(self.tenant)
+            )
+            nodes = [node for node in nodes if node["id"] is not None]
+            for start in range(0, len(nodes), batch_size):
+                self.add_many(nodes[start:start + batch_size])
+            print(f"[INFO] Index vectoriel {self.tenant} initialisé : {self.size} nœuds")
+        except Exception as e:
+            print(f"[Vector Index Error] {str(e)}")
+
+
+class _FileLock:
+    """Verrou exclusif inter-processus (flock), sans effet en mode mémoire."""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self._fd: Optional[int] = None
+
+    def __enter__(self):
+        if self.path:
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+
+# Un index par tenant, alimenté par les routes d'écriture
+vectors = TenantRegistry(VectorIndex)
@@ -0,0 +1,436 @@
+"""
+Write Buffer Module - Journal local des écritures pendant une indisponibilité de Neo4j
+Quand Neo4j est injoignable, add_node / add_edge / ingest_text sont ajoutés à un journal
+append-only (fsync groupés) et acquittés avec le statut "pending". Un thread rejoue le journal
+dans l'ordre, par grosses transactions, dès que la base répond, puis compacte le fichier.
+
+Chaque processus possède son propre journal : le premier emplacement libre parmi
+WRITE_BUFFER_DIR (emplacement 0), WRITE_BUFFER_DIR/worker-1, worker-2... verrouillé par flock.
+Un worker redémarré reprend l'emplacement libéré et rejoue ce qu'il contient.
+
+Fichiers (dans le répertoire de l'emplacement) :
+    wal.log         : une entrée JSON par ligne {seq, op, payload, ts}
+    committed       : dernier numéro de séquence rejoué avec succès
+    dead_letter.log : entrées rejetées par Neo4j (payload invalide, contrainte...), écartées du rejeu
+    lock            : verrou du processus propriétaire
+"""
+
+from typing import Any, Dict, List, Optional
+import fcntl
+import itertools
+import json
+import os
+import threading
+import time
+
+from . import metrics
+from .neo4j_client import run_transaction, breaker, DatabaseUnavailableError, QueryTimeoutError
+from .graph_index import adjacency
+from .dag_index import dags
+from .vector_index import vectors
+from .ingestion import IngestionPipeline
+from .tenancy import DEFAULT_TENANT, ensure_tenant_schema, ensure_type_schema, tenant_database, tenant_label
+
+# Répertoire du journal (vide = mode désactivé, les erreurs Neo4j remontent en 503)
+WRITE_BUFFER_DIR = os.getenv("WRITE_BUFFER_DIR", "")
+# Attente avant fsync pour grouper les écritures concurrentes (secondes)
+WRITE_BUFFER_FSYNC_DELAY = float(os.getenv("WRITE_BUFFER_FSYNC_DELAY", "0.005"))
+# Nombre d'entrées rejouées par transaction
+WRITE_BUFFER_BATCH = int(os.getenv("WRITE_BUFFER_BATCH", "500"))
+# Intervalle entre deux tentatives de rejeu (secondes)
+WRITE_BUFFER_RETRY_INTERVAL = float(os.getenv("WRITE_BUFFER_RETRY_INTERVAL", "2"))
+
+OPERATIONS = ("add_node", "add_edge", "ingest_text")
+# Erreurs après lesquelles le rejeu est retenté plus tard ; toute autre erreur écarte l'entrée
+TRANSIENT_ERRORS = (DatabaseUnavailableError, QueryTimeoutError)
+
+
+def _entry_tenant(payload: Dict[str, Any]) -> str:
+    # Entrées journalisées avant le partitionnement par tenant : tenant par défaut
+    return payload.get("tenant") or DEFAULT_TENANT
+
+
+def _apply_graph_entry(tx, op: str, payload: Dict[str, Any]):
+    """Rejoue une entrée add_node / add_edge dans la transaction courante (requêtes des routes)."""
+    tenant = _entry_tenant(payload)
+    label = tenant_label(tenant)
+    if op == "add_node":
+        tx.run("""
+        MERGE (n:{type}:{label} {{id: $id}})
+        SET n.content = $content, n.agent = $agent, n.tenant = $tenant, n.created_at = timestamp()
+        """.format(type=payload["type"], label=label), {
+            "id": payload["id"],
+            "content": payload["content"],
+            "agent": payload["agent"],
+            "tenant": tenant
+        })
+    elif op == "add_edge":
+        tx.run("""
+        MATCH (a:{label} {{id: $source}}), (b:{label} {{id: $target}})
+        MERGE (a)-[r:{type}]->(b)
+        ON CREATE SET r.created_at = timestamp(), r.tenant = $tenant, r.agent = $agent
+        """.format(type=payload["type"], label=label), {
+            "source": payload["source"],
+            "target": payload["target"],
+            "tenant": tenant,
+            "agent": payload.get("agent") or "user"
+        })
+
+
+class WriteBuffer:
+    """
+    Journal append-only avec commit groupé : chaque append() attend que son entrée soit
+    sur disque, mais un seul fsync couvre toutes les entrées arrivées entre-temps.
+    """
+
+    def __init__(self, directory: str = WRITE_BUFFER_DIR):
+        self.root = directory
+        # Répertoire de l'emplacement, choisi à l'ouverture (start ou premier append)
+        self.directory = ""
+        self._lock_fd: Optional[int] = None
+        self._open_lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._file = None
+        self._appended_seq = 0
+        self._durable_seq = 0
+        self._syncing = False
+        self._committed_seq = 0
+        # (seq, ts) des entrées non rejouées, dans l'ordre
+        self._pending: List[tuple] = []
+        self._replay_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.root)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    @property
+    def _log_path(self) -> str:
+        return os.path.join(self.directory, "wal.log")
+
+    @property
+    def _committed_path(self) -> str:
+        return os.path.join(self.directory, "committed")
+
+    # ===== Décision de mise en file =====
+
+    def should_buffer(self) -> bool:
+        """
+        True si une écriture doit passer par le journal sans tenter Neo4j :
+        circuit ouvert, ou entrées encore en attente (pour préserver l'ordre).
+        """
+        return self.enabled and (self.pending > 0 or breaker.state == "open")
+
+    def accepts(self, error: Exception) -> bool:
+        """True si l'erreur signale une indisponibilité de Neo4j que le journal peut absorber."""
+        return self.enabled and isinstance(error, DatabaseUnavailableError)
+
+    # ===== Écriture du journal =====
+
+    def _open(self):
+        """
+        Verrouille le premier emplacement libre et relit son journal.
+        Paresseux : les processus du pool d'ingestion, qui importent ce module, n'en prennent pas.
+        """
+        if self._file is not None:
+            return
+        with self._open_lock:
+            if self._file is not None:
+                return
+            for slot in itertools.count():
+                directory = self.root if slot == 0 else os.path.join(self.root, f"worker-{slot}")
+                os.makedirs(directory, exist_ok=True)
+                fd = os.open(os.path.join(directory, "lock"), os.O_RDWR | os.O_CREAT, 0o644)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    os.close(fd)
+                    continue
+                self._lock_fd = fd
+                self.directory = directory
+                break
+            self._recover()
+            print(f"[INFO] Journal local du worker {os.getpid()} : {self.directory}")
+
+    def _recover(self):
+        """Relit le pointeur de commit et le journal pour retrouver les entrées en attente."""
+        if os.path.exists(self._committed_path):
+            with open(self._committed_path) as f:
+                self._committed_seq = int(f.read().strip() or 0)
+        self._appended_seq = self._committed_seq
+        if os.path.exists(self._log_path):
+            with open(self._log_path, "rb") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # Dernière ligne tronquée par un arrêt brutal : jamais acquittée
+                        break
+                    self._appended_seq = max(self._appended_seq, entry["seq"])
+                    if entry["seq"] > self._committed_seq:
+                        self._pending.append((entry["seq"], entry["ts"]))
+        self._durable_seq = self._appended_seq
+        self._file = open(self._log_path, "ab")
+        self._update_gauges()
+
+    def append(self, op: str, payload: Dict[str, Any]) -> int:
+        """
+        Ajoute une entrée et attend qu'elle soit durable (fsync groupé).
+
+        Returns:
+            Numéro de séquence de l'entrée
+        """
+        if op not in OPERATIONS:
+            raise ValueError(f"Opération non journalisable : {op}")
+        self._open()
+        with self._cond:
+            self._appended_seq += 1
+            seq = self._appended_seq
+            now = time.time()
+            line = json.dumps({"seq": seq, "op": op, "payload": payload, "ts": now}, ensure_ascii=False)
+            self._file.write(line.encode("utf-8") + b"\n")
+            self._pending.append((seq, now))
+
+            try:
+                while self._durable_seq < seq:
+                    if self._syncing:
+                        self._cond.wait()
+                        continue
+                    # Ce thread fait le fsync pour toutes les entrées écrites jusqu'ici
+                    self._syncing = True
+                    self._cond.release()
+                    try:
+                        time.sleep(WRITE_BUFFER_FSYNC_DELAY)
+                        with self._cond:
+                            target = self._appended_seq
+                            self._file.flush()
+                        os.fsync(self._file.fileno())
+                        metrics.incr("write_buffer.fsyncs")
+                    finally:
+                        self._cond.acquire()
+                        self._syncing = False
+                        self._cond.notify_all()
+                    self._durable_seq = max(self._durable_seq, target)
+            except Exception:
+                # La requête échoue : l'entrée ne doit pas être rejouée
+                self._pending.remove((seq, now))
+                metrics.incr("write_buffer.append_errors")
+                raise
+
+        metrics.incr("write_buffer.appended")
+        self._update_gauges()
+        self._wake.set()
+        return seq
+
+    # ===== Rejeu =====
+
+    def start(self):
+        """Démarre le thread de rejeu (sans effet si désactivé)."""
+        if not self.enabled or (self._thread is not None and self._thread.is_alive()):
+            return
+        self._open()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name="write-buffer", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Arrête le thread de rejeu et ferme le journal."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=WRITE_BUFFER_RETRY_INTERVAL + 5)
+            self._thread = None
+        with self._cond:
+            if self._file is not None:
+                self._file.flush()
+                os.fsync(self._file.fileno())
+                self._file.close()
+                self._file = None
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            # Remis à zéro avant le rejeu : un append pendant le rejeu relance un tour immédiatement
+            self._wake.clear()
+            self._update_gauges()
+            if self.pending:
+                try:
+                    self.replay()
+                except Exception as e:
+                    print(f"[Write Buffer] Rejeu interrompu : {str(e)}")
+            self._wake.wait(WRITE_BUFFER_RETRY_INTERVAL)
+
+    def _read_pending(self) -> List[dict]:
+        with self._cond:
+            self._file.flush()
+            # Une entrée dont l'append a échoué n'est plus en attente
+            pending = {seq for seq, _ in self._pending if seq <= self._durable_seq}
+        entries = []
+        with open(self._log_path, "rb") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    break
+                if entry["seq"] in pending:
+                    entries.append(entry)
+        return entries
+
+    def replay(self) -> int:
+        """
+        Rejoue les entrées en attente dans l'ordre : add_node / add_edge consécutifs d'une même
+        base par transactions de WRITE_BUFFER_BATCH entrées, ingest_text via le pipeline d'ingestion.
+        Le pointeur de commit avance après chaque lot réussi. Un lot rejeté pour une autre raison
+        qu'une indisponibilité est rejoué entrée par entrée : les entrées fautives partent dans
+        dead_letter.log et le rejeu continue après elles.
+
+        Returns:
+            Nombre d'entrées rejouées
+        """
+        with self._replay_lock:
+            entries = self._read_pending()
+            replayed = 0
+            batch: List[dict] = []
+
+            def flush():
+                nonlocal replayed
+                if not batch:
+                    return
+                try:
+                    self._apply_batch(batch)
+                    replayed += len(batch)
+                except TRANSIENT_ERRORS:
+                    raise
+                except Exception:
+                    # Isole la ou les entrées fautives
+                    for entry in batch:
+                        try:
+                            self._apply_batch([entry])
+                            replayed += 1
+                        except TRANSIENT_ERRORS:
+                            raise
+                        except Exception as e:
+                            self._dead_letter(entry, e)
+                self._commit(batch[-1]["seq"])
+                metrics.incr("write_buffer.replay_batches")
+                batch.clear()
+
+            for entry in entries:
+                if entry["op"] == "ingest_text":
+                    flush()
+                    try:
+                        # Rejeu au moins une fois : un échec en cours de document peut dupliquer des Tasks
+                        pipeline = IngestionPipeline(agent=entry["payload"]["agent"], tenant=_entry_tenant(entry["payload"]))
+                        pipeline.feed(entry["payload"]["text"])
+                        pipeline.close()
+                        replayed += 1
+                    except TRANSIENT_ERRORS:
+                        raise
+                    except Exception as e:
+                        self._dead_letter(entry, e)
+                    self._commit(entry["seq"])
+                    continue
+                # Une transaction ne couvre qu'une base : changement de base = nouveau lot
+                if batch and tenant_database(_entry_tenant(entry["payload"])) != \
+                        tenant_database(_entry_tenant(batch[0]["payload"])):
+                    flush()
+                batch.append(entry)
+                if len(batch) >= WRITE_BUFFER_BATCH:
+                    flush()
+            flush()
+
+            if replayed:
+                metrics.incr("write_buffer.replayed", replayed)
+                print(f"[Write Buffer] {replayed} écriture(s) rejouée(s)")
+            self._compact()
+            return replayed
+
+    def _apply_batch(self, batch: List[dict]):
+        """Rejoue des add_node / add_edge d'une même base en une transaction, puis met à jour les index."""
+        for entry in batch:
+            tenant = _entry_tenant(entry["payload"])
+            ensure_tenant_schema(tenant)
+            ensure_type_schema("node" if entry["op"] == "add_node" else "edge", entry["payload"]["type"], tenant)
+        run_transaction(
+            lambda tx: [_apply_graph_entry(tx, e["op"], e["payload"]) for e in batch],
+            database=tenant_database(_entry_tenant(batch[0]["payload"]))
+        )
+        for entry in batch:
+            self._sync_indexes(entry)
+
+    def _dead_letter(self, entry: dict, error: Exception):
+        """Écarte une entrée que Neo4j rejette : elle est conservée pour inspection, pas rejouée."""
+        line = json.dumps({**entry, "error": f"{type(error).__name__}: {error}", "dead_at": time.time()},
+                          ensure_ascii=False)
+        with open(os.path.join(self.directory, "dead_letter.log"), "ab") as f:
+            f.write(line.encode("utf-8") + b"\n")
+            f.flush()
+            os.fsync(f.fileno())
+        metrics.incr("write_buffer.dead_letters")
+        print(f"[Write Buffer] Entrée {entry['seq']} écartée ({type(error).__name__}: {error})")
+
+    def _sync_indexes(self, entry: dict):
+        payload = entry["payload"]
+        tenant = _entry_tenant(payload)
+        if entry["op"] == "add_node":
+            adjacency.get(tenant).add_node(payload["id"], payload["type"])
+            vectors.get(tenant).add(payload["id"], payload["type"], payload["content"])
+        elif entry["op"] == "add_edge":
+            adjacency.get(tenant).add_edge(payload["source"], payload["type"], payload["target"])
+            dags.get(tenant).add_edge(payload["source"], payload["type"], payload["target"])
+
+    def _commit(self, seq: int):
+        """Avance le pointeur de commit (écriture atomique) et retire les entrées rejouées."""
+        tmp_path = f"{self._committed_path}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(str(seq))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._committed_path)
+        with self._cond:
+            self._committed_seq = seq
+            while self._pending and self._pending[0][0] <= seq:
+                self._pending.pop(0)
+        metrics.set_gauge("write_buffer.last_replay_at", time.time())
+        self._update_gauges()
+
+    def _compact(self):
+        """Réécrit le journal sans les entrées déjà rejouées (bloque brièvement les append)."""
+        with self._cond:
+            if self._syncing:
+                return
+            self._file.flush()
+            tmp_path = f"{self._log_path}.tmp"
+            kept = 0
+            with open(self._log_path, "rb") as src, open(tmp_path, "wb") as dst:
+                for line in src:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if entry["seq"] > self._committed_seq:
+                        dst.write(line)
+                        kept += 1
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.replace(tmp_path, self._log_path)
+            self._file.close()
+            self._file = open(self._log_path, "ab")
+        metrics.incr("write_buffer.compactions")
+
+    def _update_gauges(self):
+        pending = self._pending
+        metrics.set_gauge("write_buffer.pending", len(pending))
+        metrics.set_gauge("write_buffer.replay_lag_s", round(time.time() - pending[0][1], 3) if pending else 0.0)
+
+
+# Instance partagée, utilisée par les routes d'écriture
+write_buffer = WriteBuffer()